@@ -3,10 +3,12 @@ from contextlib import contextmanager
 from inspect import getdoc
 import os
 from sqlite3 import Connection as SQLite3Connection
-from typing import List, NamedTuple, Optional, Type
+from typing import Iterable, List, NamedTuple, Optional, Type
 
 import sqlalchemy as sqla
+from sqlalchemy.ext import baked
 from sqlalchemy.orm import scoped_session, sessionmaker, Session
+from sqlalchemy.pool import StaticPool
 
 from .models import (  # noqa: F401
     OrmBase,
@@ -21,12 +23,24 @@ from .models import (  # noqa: F401
 )
 
 
+# cache of the compiled SQL for frequent (e.g. per hover/completion) queries
+_BAKERY = baked.bakery()
+
+
 @sqla.event.listens_for(sqla.engine.Engine, "connect")
 def _set_sqlite_pragma(dbapi_connection, connection_record):
-    """Enforce foreign key constraints, when using sqlite backend (off by default)"""
+    """Enforce foreign key constraints, when using sqlite backend (off by default),
+    and reduce the cost of commits.
+
+    The database is a cache, which can be rebuilt from the source files,
+    so writes are made to a write-ahead log, which is not synced to disk
+    on every commit.
+    """
     if isinstance(dbapi_connection, SQLite3Connection):
         cursor = dbapi_connection.cursor()
         cursor.execute("PRAGMA foreign_keys=ON;")
+        cursor.execute("PRAGMA journal_mode=WAL;")
+        cursor.execute("PRAGMA synchronous=NORMAL;")
         cursor.close()
 
 
@@ -57,12 +71,32 @@ def get_directive_kwargs(name, direct) -> dict:
     return data
 
 
+def _create_engine(db_path: str, **kwargs) -> sqla.engine.Engine:
+    if db_path == ":memory:":
+        # share a single connection, since each connection has its own memory database
+        return sqla.create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+            **kwargs,
+        )
+    return sqla.create_engine(f"sqlite:///{db_path}", **kwargs)
+
+
 class DocutilsCache:
     def __init__(
         self, db_folder_path: str, db_file_name: str = "docutils.db", **kwargs
     ):
-        self._db_path = os.path.join(db_folder_path, db_file_name)
-        self._engine = sqla.create_engine(f"sqlite:///{self._db_path}", **kwargs)
+        """Initialise the database.
+
+        :param db_folder_path: the folder in which to create the database,
+            or ``:memory:`` for a (non-persistent) in-memory database
+        """
+        if db_folder_path == ":memory:":
+            self._db_path = db_folder_path
+        else:
+            self._db_path = os.path.join(db_folder_path, db_file_name)
+        self._engine = _create_engine(self._db_path, **kwargs)
         OrmBase.metadata.create_all(self._engine)
         self._session_factory = sessionmaker(bind=self._engine)
 
@@ -79,7 +113,7 @@ class DocutilsCache:
 
     def __setstate__(self, newstate):
         """For unpickling instance."""
-        newstate["_engine"] = sqla.create_engine(f"sqlite:///{newstate['_db_path']}")
+        newstate["_engine"] = _create_engine(newstate["_db_path"])
         newstate["_session_factory"] = sessionmaker(bind=newstate["_engine"])
         self.__dict__.update(newstate)
 
@@ -189,10 +223,14 @@ class DocutilsCache:
 
     def query_role(self, name: str, allow_removed=False) -> Optional[OrmRole]:
         with self.context_session() as session:  # type: Session
-            filters = [OrmRole.name == name]
+            query = _BAKERY(
+                lambda s: s.query(OrmRole).filter(
+                    OrmRole.name == sqla.bindparam("name")
+                )
+            )
             if not allow_removed:
-                filters.append(OrmRole.status == "ok")
-            orm = session.query(OrmRole).filter(*filters).first()
+                query += lambda q: q.filter(OrmRole.status == "ok")
+            orm = query(session).params(name=name).first()
             if orm:
                 session.expunge(orm)
         return orm
@@ -208,10 +246,14 @@ class DocutilsCache:
 
     def query_directive(self, name: str, allow_removed=False) -> Optional[OrmDirective]:
         with self.context_session() as session:  # type: Session
-            filters = [OrmDirective.name == name]
+            query = _BAKERY(
+                lambda s: s.query(OrmDirective).filter(
+                    OrmDirective.name == sqla.bindparam("name")
+                )
+            )
             if not allow_removed:
-                filters.append(OrmDirective.status == "ok")
-            orm = session.query(OrmDirective).filter(*filters).first()
+                query += lambda q: q.filter(OrmDirective.status == "ok")
+            orm = query(session).params(name=name).first()
             if orm:
                 session.expunge(orm)
         return orm
@@ -243,74 +285,99 @@ class DocutilsCache:
         update_outdated=False,
     ):
         with self.context_session() as session:  # type: Session
-            doc = session.query(OrmDocument).filter_by(uri=uri).first()
-            if not doc:
-                session.add(OrmDocument(uri=uri, mtime=mtime, symbols=doc_symbols))
-            elif doc.mtime >= mtime and not update_outdated:
-                return
-            else:
-                doc.mtime = mtime
-                doc.symbols = doc_symbols
-
-            session.query(OrmDocLint).filter_by(uri=uri).delete()
-            ref_pks = [
-                pk
-                for (pk,) in (
-                    session.query(OrmReference.pk)
-                    .outerjoin(OrmPosition)
-                    .filter(OrmPosition.uri == uri)
-                    .all()
-                )
-            ]
-            session.query(OrmReference).filter(OrmReference.pk.in_(ref_pks)).delete(
-                synchronize_session=False
+            self._update_doc(
+                session,
+                uri,
+                mtime,
+                doc_symbols,
+                positions=positions,
+                lints=lints,
+                references=references,
+                targets=targets,
+                assert_dict_keys=assert_dict_keys,
+                update_outdated=update_outdated,
             )
-            # TODO this will fail if any targets are referenced by another document
-            target_pks = [
-                pk
-                for (pk,) in (
-                    session.query(OrmTarget.pk)
-                    .outerjoin(OrmPosition)
-                    .filter(OrmPosition.uri == uri)
-                    .all()
-                )
-            ]
-            session.query(OrmTarget).filter(OrmTarget.pk.in_(target_pks)).delete(
-                synchronize_session=False
-            )
-            session.query(OrmPosition).filter_by(uri=uri).delete()
 
-            for orm_class, new_dicts in [
-                (OrmDocLint, lints),
-                (OrmPosition, positions),
-                (OrmTarget, targets),
-                (OrmReference, references),
-            ]:
-                if assert_dict_keys:
-                    column_names = set(orm_class.column_names())
-                    for i, new_dict in enumerate(new_dicts):
-                        diff = set(new_dict.keys()).difference(column_names)
-                        if diff:
-                            raise AssertionError(
-                                f"Some keys of dict {i} are not valid columns of "
-                                f"{orm_class.__name__}: {diff}"
-                            )
-                if issubclass(orm_class, (OrmDocLint, OrmPosition)):
-                    for new_dict in new_dicts:
-                        new_dict["uri"] = uri
-                if new_dicts:
-                    session.bulk_insert_mappings(orm_class, new_dicts)
+    def update_docs(self, updates: Iterable[dict]):
+        """Update multiple documents, within a single session/transaction.
+
+        :param updates: the keyword arguments for ``update_doc``, for each document
+        """
+        with self.context_session() as session:  # type: Session
+            for kwargs in updates:
+                self._update_doc(session, **kwargs)
+
+    def _update_doc(
+        self,
+        session: Session,
+        uri: str,
+        mtime: datetime,
+        doc_symbols: List[dict],
+        *,
+        positions: List[dict],
+        lints: List[dict],
+        references: List[dict],
+        targets: List[dict],
+        assert_dict_keys=True,
+        update_outdated=False,
+    ):
+        doc = session.query(OrmDocument).filter_by(uri=uri).first()
+        if not doc:
+            session.add(OrmDocument(uri=uri, mtime=mtime, symbols=doc_symbols))
+        elif doc.mtime >= mtime and not update_outdated:
+            return
+        else:
+            doc.mtime = mtime
+            doc.symbols = doc_symbols
+
+        session.query(OrmDocLint).filter_by(uri=uri).delete()
+        position_uuids = session.query(OrmPosition.uuid).filter(
+            OrmPosition.uri == uri
+        )
+        session.query(OrmReference).filter(
+            OrmReference.position_uuid.in_(position_uuids)
+        ).delete(synchronize_session=False)
+        # TODO this will fail if any targets are referenced by another document
+        session.query(OrmTarget).filter(
+            OrmTarget.position_uuid.in_(position_uuids)
+        ).delete(synchronize_session=False)
+        session.query(OrmPosition).filter_by(uri=uri).delete()
+
+        for orm_class, new_dicts in [
+            (OrmDocLint, lints),
+            (OrmPosition, positions),
+            (OrmTarget, targets),
+            (OrmReference, references),
+        ]:
+            if assert_dict_keys:
+                column_names = set(orm_class.column_names())
+                for i, new_dict in enumerate(new_dicts):
+                    diff = set(new_dict.keys()).difference(column_names)
+                    if diff:
+                        raise AssertionError(
+                            f"Some keys of dict {i} are not valid columns of "
+                            f"{orm_class.__name__}: {diff}"
+                        )
+            if issubclass(orm_class, (OrmDocLint, OrmPosition)):
+                for new_dict in new_dicts:
+                    new_dict["uri"] = uri
+            if new_dicts:
+                session.bulk_insert_mappings(orm_class, new_dicts)
 
     def query_doc(
         self, uri: str, load_lints: bool = False, load_positions: bool = False
     ) -> Optional[OrmDocument]:
         with self.context_session() as session:  # type: Session
-            query = session.query(OrmDocument).filter_by(uri=uri)
+            query = _BAKERY(
+                lambda s: s.query(OrmDocument).filter(
+                    OrmDocument.uri == sqla.bindparam("uri")
+                )
+            )
             if load_lints:
-                query = query.options(sqla.orm.joinedload(OrmDocument.lints))
+                query += lambda q: q.options(sqla.orm.joinedload(OrmDocument.lints))
             if load_positions:
-                query = query.options(sqla.orm.joinedload(OrmDocument.positions))
-            orm = query.first()
+                query += lambda q: q.options(sqla.orm.joinedload(OrmDocument.positions))
+            orm = query(session).params(uri=uri).first()
             if orm:
                 session.expunge(orm)
         return orm
@@ -352,6 +419,18 @@ class DocutilsCache:
                 .filter(OrmPosition.uri == uri)
                 .filter(OrmPosition.startLine <= line)
                 .filter(OrmPosition.endLine >= line)
+                .filter(
+                    sqla.or_(
+                        OrmPosition.startLine < line,
+                        OrmPosition.startCharacter <= character,
+                    )
+                )
+                .filter(
+                    sqla.or_(
+                        OrmPosition.endLine > line,
+                        OrmPosition.endCharacter >= character,
+                    )
+                )
             )
             for name, value in (filters_equal or {}).items():
                 query = query.filter(getattr(OrmPosition, name) == value)
@@ -399,21 +478,9 @@ class DocutilsCache:
             # find the inner position (i.e. the one that has the smallest line range)
             # TODO also smallest character range, if both single line?
             # e.g. `.. |sub| replace:: a`
-            final_result = None
-            final_line_range = None
-            for position in query:  # type: OrmPosition
-                if line == position.startLine and character < position.startCharacter:
-                    continue
-                if line == position.endLine and character > position.endCharacter:
-                    continue
-                line_range = position.endLine - position.startLine
-                if final_result is None:
-                    final_line_range = line_range
-                    final_result = position
-                    continue
-                if line_range < final_line_range:
-                    final_line_range = line_range
-                    final_result = position
+            final_result = query.order_by(
+                OrmPosition.endLine - OrmPosition.startLine, OrmPosition.pk
+            ).first()  # type: Optional[OrmPosition]
             if final_result is not None and not existing_session:
                 if load_role or load_directive or load_definitions or load_references:
                     session.expunge_all()
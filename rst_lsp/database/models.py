@@ -146,6 +146,10 @@ class OrmPosition(OrmBase):
     """
 
     __tablename__ = "doc_positions"
+    # for range queries of the positions in a document, e.g. ``query_at_position``
+    __table_args__ = (
+        sqla.Index("ix_doc_positions_uri_lines", "uri", "startLine", "endLine"),
+    )
 
     pk = Column(sqla.Integer, primary_key=True)
     uuid = Column(sqla.String(36), nullable=False, unique=True, default=uuid.uuid4)
@@ -2,3 +2,6 @@
 
 Note: this module has no dependencies on sphinx
 """
+# the docutils globals are patched to be thread local on import of this package,
+# i.e. before any of its modules bind them (e.g. ``nodes.GenericNodeVisitor``)
+from rst_lsp.docutils_ext import patch_globals  # noqa: F401
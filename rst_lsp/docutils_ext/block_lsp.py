@@ -29,10 +29,13 @@ class RSTParserCustom(Parser):
     def __init__(self, inliner=None):
         self.initial_state = "Body"
         self.state_classes = get_state_classes()
+        self.inliner = inliner
+
+    def parse(self, inputstring, document):
         for state_class in self.state_classes:
             # flush any cached states from the last parse
             state_class.nested_sm_cache = []
-        self.inliner = inliner
+        super().parse(inputstring, document)
 
 
 class LSPSection(nodes.Element, nodes.Invisible):
@@ -51,12 +51,20 @@ def get_column2position(lineno: int, text_original: str, text_dedented: str):
 
 
 class InlinerLSP(Inliner):
+    regex_role_start = re.compile("^:([^:]+):.*")
+    regex_role_end = re.compile(".*:([^:]+):$")
+
     def __init__(self, *, doc_text, **kwargs):
         """Initialise inliner."""
         super().__init__(**kwargs)
+        self.set_content(doc_text)
+
+    def set_content(self, doc_text: str):
+        """Set the source text of the document to be parsed.
+
+        This allows the inliner to be reused for parsing multiple documents.
+        """
         self.content_lines = doc_text.splitlines()
-        self.regex_role_start = re.compile("^:([^:]+):.*")
-        self.regex_role_end = re.compile(".*:([^:]+):$")
 
     def parse(
         self, text: str, lineno: int, memo: Any, parent: Any
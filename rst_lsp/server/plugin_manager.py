@@ -1,7 +1,6 @@
 # TODO annotate hooks
 # https://stackoverflow.com/questions/54674679/how-can-i-annotate-types-for-a-pluggy-hook-specification
 from enum import Enum
-import pkg_resources
 
 # from typing import NamedTuple
 
@@ -150,9 +149,17 @@ def create_manager(logger=None):
     # However we don't all plugins to have to catch ImportError and re-throw.
     # So here we'll filter out any entry points that throw ImportError,
     # assuming one or more of their dependencies isn't present.
+    # The loaded plugins are registered directly, rather than via
+    # `load_setuptools_entrypoints`, which would iterate and load them all again.
+    import pkg_resources
+
     for entry_point in pkg_resources.iter_entry_points(PROJECT_NAME):
+        if manager.get_plugin(entry_point.name) or manager.is_blocked(
+            entry_point.name
+        ):
+            continue
         try:
-            entry_point.load()
+            plugin = entry_point.load()
         except ImportError as e:
             if logger is not None:
                 logger.warning(
@@ -162,9 +169,8 @@ def create_manager(logger=None):
                     e,
                 )
             manager.set_blocked(entry_point.name)
-
-    # Load the entry points into pluggy, having blocked any failing ones
-    manager.load_setuptools_entrypoints(PROJECT_NAME)
+            continue
+        manager.register(plugin, name=entry_point.name)
 
     if logger is not None:
         for name, plugin in manager.list_name_plugin():
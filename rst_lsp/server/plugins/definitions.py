@@ -13,7 +13,7 @@ def rst_definitions(
     config: Config, document: Document, position: Position
 ) -> List[Location]:
 
-    database = document.workspace.database
+    database = document.workspace.ensure_synced()
     uri = document.uri
     result = database.query_at_position(
         uri=uri,
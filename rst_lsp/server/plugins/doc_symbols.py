@@ -10,6 +10,6 @@ def rst_document_symbols(
     config: Config, workspace: Workspace, document: Document
 ) -> List[DocumentSymbol]:
 
-    database = workspace.database
+    database = workspace.ensure_synced()
     uri = document.uri
     return database.query_doc(uri=uri).symbols or []
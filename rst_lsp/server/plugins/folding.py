@@ -11,7 +11,7 @@ logger = logging.getLogger(__name__)
 @hookimpl
 def rst_folding_range(document: Document) -> List[FoldingRange]:
 
-    database = document.workspace.database
+    database = document.workspace.ensure_synced()
     uri = document.uri
     doc = database.query_doc(uri=uri, load_positions=True)
     results = [
@@ -12,7 +12,7 @@ logger = logging.getLogger(__name__)
 @hookimpl
 def rst_hover(document: Document, position: Position) -> Hover:
 
-    database = document.workspace.database
+    database = document.workspace.ensure_synced()
 
     uri = document.uri
     result = database.query_at_position(
@@ -14,7 +14,7 @@ SEVERITY_MAP = {
 
 @hookimpl
 def rst_lint(config: Config, document: Document, is_saved: bool) -> List[Diagnostic]:
-    database = document.workspace.database
+    database = document.workspace.ensure_synced()
     uri = document.uri
     results = []
     for lint in database.query_doc(uri, load_lints=True).lints:
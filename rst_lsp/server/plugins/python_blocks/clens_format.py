@@ -13,7 +13,7 @@ def rst_code_lens(
     config: Config, workspace: Workspace, document: Document
 ) -> List[CodeLens]:
 
-    database = workspace.database
+    database = workspace.ensure_synced()
     uri = document.uri
 
     results = (
@@ -24,31 +24,25 @@ def rst_code_lens(
         )
         or []
     )
+    lines = document.lines
     edits = []
     for result in results:
         if result.directive_data is None or "python" not in result.directive_data.get(
             "arguments", []
         ):
             continue
+        # the lens is zero-width, so the same point is shared by start and end
+        point = {"line": result.startLine, "character": result.startCharacter}
         edits.append(
             {
-                "range": {
-                    "start": {
-                        "line": result.startLine,
-                        "character": result.startCharacter,
-                    },
-                    "end": {
-                        "line": result.startLine,
-                        "character": result.startCharacter,
-                    },
-                },
+                "range": {"start": point, "end": point},
                 "command": {
                     "title": "format",
                     "command": COMMAND_NAME,
                     "arguments": [
                         uri,
                         result._asdict(),
-                        document.lines[result.startLine : result.endLine + 1],
+                        lines[result.startLine : result.endLine + 1],
                     ],
                 },
             }
@@ -83,9 +77,13 @@ def rst_execute_command(
         return {"changes": {}}
 
     indent_spaces = len(lines[start_line]) - len(lines[start_line].lstrip())
-    text = dedent("".join(lines[start_line:]))
+    text = "".join(lines[start_line:])
+    if indent_spaces:
+        text = dedent(text)
     # TODO add warning message, if black formatting fails
     text = black.format_str(text, mode=black.FileMode()).rstrip()
+    if indent_spaces:
+        text = indent(text, indent_spaces * " ")
 
     return {
         "changes": {
@@ -98,7 +96,7 @@ def rst_execute_command(
                         },
                         "end": {"line": result["endLine"], "character": len(lines[-1])},
                     },
-                    "newText": indent(text, indent_spaces * " "),
+                    "newText": text,
                 }
             ]
         }
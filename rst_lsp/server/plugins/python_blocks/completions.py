@@ -5,7 +5,7 @@ from rst_lsp.server.workspace import Config, Document, Workspace
 from rst_lsp.server.datatypes import Position
 from rst_lsp.server.constants import CompletionItemKind
 
-from .utils import format_docstring
+from .utils import dedent_cell, format_docstring
 
 logger = logging.getLogger(__name__)
 
@@ -49,7 +49,7 @@ def rst_completions(
     config: Config, workspace: Workspace, document: Document, position: Position
 ):
     logger.debug("called python completions")
-    database = workspace.database
+    database = workspace.ensure_synced()
     uri = document.uri
 
     result = database.query_at_position(
@@ -70,9 +70,7 @@ def rst_completions(
         return None
 
     lines = document.lines[result.directive_data["contentLine"] : result.endLine + 1]
-    text = "\n".join(
-        [l[result.directive_data["contentIndent"] :].replace("\n", "") for l in lines]
-    )
+    text = dedent_cell(lines, result.directive_data["contentIndent"])
     # TODO add warning message, if jedi not installed
     import jedi
 
@@ -4,7 +4,7 @@ from rst_lsp.server.datatypes import Position, Hover
 from rst_lsp.server.workspace import Document
 from rst_lsp.server.plugin_manager import hookimpl
 
-from .utils import format_docstring
+from .utils import dedent_cell, format_docstring
 
 logger = logging.getLogger(__name__)
 
@@ -12,7 +12,7 @@ logger = logging.getLogger(__name__)
 @hookimpl
 def rst_hover(document: Document, position: Position) -> Hover:
 
-    database = document.workspace.database
+    database = document.workspace.ensure_synced()
     uri = document.uri
 
     result = database.query_at_position(
@@ -33,9 +33,7 @@ def rst_hover(document: Document, position: Position) -> Hover:
         return None
 
     lines = document.lines[result.directive_data["contentLine"] : result.endLine + 1]
-    text = "\n".join(
-        [l[result.directive_data["contentIndent"] :].replace("\n", "") for l in lines]
-    )
+    text = dedent_cell(lines, result.directive_data["contentIndent"])
     # TODO add warning message, if jedi not installed
     import jedi
 
@@ -1,3 +1,6 @@
+from typing import List
+
+
 def format_docstring(contents):
     """Python doc strings come in a number of formats, but LSP wants markdown.
 
@@ -7,3 +10,12 @@ def format_docstring(contents):
     contents = contents.replace("\t", "\u00A0" * 4)
     contents = contents.replace("  ", "\u00A0" * 2)
     return contents
+
+
+def dedent_cell(lines: List[str], indent: int) -> str:
+    """Join the lines of a code cell, removing the first ``indent`` characters of each.
+
+    Each line is sliced individually, so that short (or empty) lines and
+    ``\\r`` line endings are handled the same as every other line.
+    """
+    return "\n".join(line[indent:].replace("\n", "") for line in lines)
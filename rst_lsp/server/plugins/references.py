@@ -14,7 +14,7 @@ def rst_references(
 ) -> List[Location]:
     # exclude the declaration of the current symbol
 
-    database = document.workspace.database
+    database = document.workspace.ensure_synced()
     uri = document.uri
     result = database.query_at_position(
         uri=uri,
@@ -36,18 +36,34 @@ def rst_references(
     # reference -> target -> reference
 
     locations = []
+    seen = set()
+
+    def _add_location(position):
+        # the same position can be reached via multiple target/reference paths
+        key = (
+            position.uri,
+            position.startLine,
+            position.startCharacter,
+            position.endLine,
+            position.endCharacter,
+        )
+        if key in seen:
+            return
+        seen.add(key)
+        locations.append(_get_position_dict(position))
+
     for target in result.targets:
         if not exclude_declaration:
-            locations.append(_get_position_dict(target.position))
+            _add_location(target.position)
         for reference in target.references:
-            locations.append(_get_position_dict(reference.position))
+            _add_location(reference.position)
     for reference in result.references:
         if not exclude_declaration:
-            locations.append(_get_position_dict(reference.position))
+            _add_location(reference.position)
         if reference.target:
-            locations.append(_get_position_dict(reference.target.position))
+            _add_location(reference.target.position)
             for reference in reference.target.references:
-                locations.append(_get_position_dict(reference.position))
+                _add_location(reference.position)
 
     return locations
 
@@ -28,6 +28,9 @@ def is_process_alive(pid: int) -> bool:
     Hence ctypes is used to check for the process directly,
     via windows API avoiding any other 3rd-party dependency.
 
+    On Linux, ``os.pidfd_open`` is used where available,
+    which does not have the ambiguous ``EPERM`` semantics of ``os.kill``.
+
     """
     if os.name == "nt":
         kernel32 = ctypes.windll.kernel32
@@ -40,6 +43,17 @@ def is_process_alive(pid: int) -> bool:
     else:
         if pid < 0:
             return False
+        if hasattr(os, "pidfd_open"):
+            # Linux only (python>=3.9), this avoids going through the signal machinery
+            try:
+                os.close(os.pidfd_open(pid))
+            except ProcessLookupError:
+                return False
+            except OSError:
+                # e.g. not supported by the kernel, so fall back to os.kill
+                pass
+            else:
+                return True
         try:
             os.kill(pid, 0)
         except OSError as e:
@@ -60,31 +74,46 @@ def find_parents(root: str, path: str, names: List[str]):
     path: str
         The file path to start searching up from.
     names: list
-        The file/directory names to look for.
+        The file names to look for (directories of the same name are ignored).
 
     """
     if not root:
         return []
 
-    if not os.path.commonprefix((root, path)):
+    root = os.path.abspath(root)
+    search_dir = os.path.abspath(os.path.dirname(path))
+    try:
+        within_root = os.path.commonpath((root, search_dir)) == root
+    except ValueError:
+        # e.g. paths on different drives (windows)
+        within_root = False
+    if not within_root:
         logger.warning("Path %s not in %s", path, root)
         return []
 
-    # Split the relative by directory, generate all the parent directories,
-    # then check each of them.
-    # This avoids running a loop that has different base-cases for unix/windows
-    # e.g. /a/b and /a/b/c/d/e.py -> ['/a/b', 'c', 'd']
-    dirs = [root] + os.path.relpath(os.path.dirname(path), root).split(os.path.sep)
+    name_set = set(names)
+    root_key = os.path.normcase(root)
 
     # Search each of /a/b/c, /a/b, /a
-    while dirs:
-        search_dir = os.path.join(*dirs)
-        existing = list(
-            filter(os.path.exists, [os.path.join(search_dir, n) for n in names])
-        )
+    while True:
+        # list the directory once, rather than stat-ing each candidate path,
+        # and check the file type from the (cached) directory entry
+        try:
+            with os.scandir(search_dir) as entries:
+                found = {
+                    entry.name
+                    for entry in entries
+                    if entry.name in name_set and entry.is_file()
+                }
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            found = set()
+        existing = [os.path.join(search_dir, n) for n in names if n in found]
         if existing:
             return existing
-        dirs.pop()
-
-    # Otherwise nothing
-    return []
+        parent_dir = os.path.dirname(search_dir)
+        # compare case-normalised paths, since commonpath ignores case on windows,
+        # and never recurse past the filesystem root
+        if os.path.normcase(search_dir) == root_key or parent_dir == search_dir:
+            # Otherwise nothing
+            return []
+        search_dir = parent_dir
@@ -1,16 +1,20 @@
-from concurrent.futures import Future
+from concurrent.futures import Future, ProcessPoolExecutor
 import datetime
+from functools import lru_cache
 import hashlib
-import io
+from itertools import accumulate
 import logging
 import os
-import pathlib
 import re
-from typing import Dict, List
+import string
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from rst_lsp.database.main import DocutilsCache
 from rst_lsp.sphinx_ext.main import (
+    assess_files,
     assess_source,
+    create_assess_pool,
     create_sphinx_app,
     find_all_files,
     retrieve_namespace,
@@ -29,6 +33,7 @@ logger = logging.getLogger(__name__)
 # TODO: this is not the best e.g. we capture numbers
 RE_START_WORD = re.compile("[A-Za-z_0-9]*$")
 RE_END_WORD = re.compile("^[A-Za-z_0-9]*")
+WORD_CHARS = string.ascii_letters + string.digits + "_"
 
 
 class Config:
@@ -96,7 +101,9 @@ class Workspace(object):
         self._server = server
         self._root_uri_scheme = uris.urlparse(self._root_uri)[0]
         self._root_path = uris.to_fs_path(self._root_uri)
+        self._root_path_abs = os.path.abspath(self._root_path)
         self._open_docs = {}
+        self._source_roots_cache = {}  # type: Dict[Tuple[str, str], List[str]]
 
         self._root_uri_hash = hashlib.md5(root_uri.encode("utf-8")).hexdigest()
         # TODO persist cache?
@@ -104,6 +111,8 @@ class Workspace(object):
         path = create_default_cache_path(self._root_uri_hash, "database")
         self._db = DocutilsCache(str(path), echo=False)
 
+        self._assess_pool = None  # type: Optional[ProcessPoolExecutor]
+        self._assess_pool_lock = threading.Lock()
         self._update_env()
 
     def _update_env(self):
@@ -111,6 +120,9 @@ class Workspace(object):
         # TODO how to watch conf.py for changes? (or at least have command to update)
         # TODO use self.source_roots to find conf path?
         # TODO allow source directory to be different to conf path
+        self._source_roots_cache = {}
+        # the pool workers use the previous sphinx configuration
+        self._shutdown_assess_pool()
         conf_path = self._config.settings.get("conf_path", None)
         logger.debug(f"Settings: {self._config.settings}")
         if conf_path and not os.path.exists(conf_path):
@@ -151,32 +163,70 @@ class Workspace(object):
         # TODO when to remove roles and directives with 'removed' status?
 
     def close(self):
+        self._shutdown_assess_pool()
         # TODO persist cache?
         remove_default_cache_path(self._root_uri_hash)
 
+    def _get_assess_pool(self) -> ProcessPoolExecutor:
+        """Return the pool of worker processes, for parsing closed files.
+
+        This is created on first use, then kept until the sphinx application changes,
+        since every worker imports sphinx and creates its own application.
+        """
+        with self._assess_pool_lock:
+            if self._assess_pool is None:
+                self._assess_pool = create_assess_pool(self.app_env.app.confdir)
+            return self._assess_pool
+
+    def _shutdown_assess_pool(self):
+        with self._assess_pool_lock:
+            if self._assess_pool is not None:
+                self._assess_pool.shutdown(wait=False)
+                self._assess_pool = None
+
     @property
     def documents(self) -> dict:
         return self._open_docs
 
     @property
     def database(self) -> DocutilsCache:
-        """Return the workspace database.
+        """Return the workspace database, without syncing the open documents.
+
+        This is sufficient for data that does not derive from the documents,
+        such as roles and directives. Use ``ensure_synced`` otherwise.
+        """
+        return self._db
+
+    def ensure_synced(self) -> DocutilsCache:
+        """Return the workspace database, after syncing the open documents.
 
         If any document's source text hasn't been parsed/assessed, since its last change
         (or config update), then that will be done, and the database updated,
-        before returning.
+        before returning. Documents already pushed to the database are skipped,
+        and the remaining updates are written in a single transaction.
         """
+        updates = []
+        synced = []
         for doc in self._open_docs.values():
+            if doc._db_synced:
+                continue
             result = doc.get_assessment()  # type: SourceAssessResult
-            self._db.update_doc(
-                doc.uri,
-                doc.mtime,
-                doc_symbols=result.doc_symbols,
-                positions=result.positions,
-                targets=result.targets,
-                references=result.references,
-                lints=result.linting,
+            updates.append(
+                dict(
+                    uri=doc.uri,
+                    mtime=doc.mtime,
+                    doc_symbols=result.doc_symbols,
+                    positions=result.positions,
+                    targets=result.targets,
+                    references=result.references,
+                    lints=result.linting,
+                )
             )
+            synced.append(doc)
+        if updates:
+            self._db.update_docs(updates)
+            for doc in synced:
+                doc._db_synced = True
         return self._db
 
     @property
@@ -257,21 +307,14 @@ class Workspace(object):
     def parse_closed_files(self, paths):
         # TODO send progress to client (will require next LSP version 3.15.0)
         passed = 0
-        for path in paths:
+        # TODO check doc not in database with same mtime
+        for path, future in assess_files(paths, self.app_env, self._get_assess_pool):
             try:
-                with open(path) as handle:
-                    source = handle.read()
-                # TODO check doc not in database with same mtime
-                result = assess_source(source, self.app_env, doc_uri=path)
                 self._db.update_doc(
                     uri=uris.from_fs_path(path),
                     # TODO use os.path.getmtime(path)?
                     mtime=datetime.datetime.utcnow(),
-                    doc_symbols=result.doc_symbols,
-                    positions=result.positions,
-                    targets=result.targets,
-                    references=result.references,
-                    lints=result.linting,
+                    **future.result(),
                 )
                 self.server.log_message(f"file parsed: {uris.from_fs_path(path)}")
                 passed += 1
@@ -293,10 +336,13 @@ class Workspace(object):
         """Return the source roots for the given document."""
         if not self.is_local:
             return None
-        files = find_parents(self._root_path, document_path, [filename]) or []
-        return list(set((os.path.dirname(project_file) for project_file in files))) or [
-            self._root_path
-        ]
+        key = (os.path.dirname(document_path), filename)
+        if key not in self._source_roots_cache:
+            files = find_parents(self._root_path_abs, document_path, [filename]) or []
+            self._source_roots_cache[key] = list(
+                set((os.path.dirname(project_file) for project_file in files))
+            ) or [self._root_path]
+        return list(self._source_roots_cache[key])
 
     def _create_document(self, document: TextDocument):
         return Document(
@@ -331,7 +377,11 @@ class Document:
         self._workspace = workspace
         self._local = local
         self._source = source
+        self._disk_source = None
+        self._disk_mtime = None
+        self._buffer = None
         self._assessment = None
+        self._db_synced = False
         self._mtime = datetime.datetime.utcnow()
 
     @property
@@ -347,13 +397,26 @@ class Document:
 
     @property
     def lines(self) -> List[str]:
-        return self.source.splitlines(True)
+        return self._buf().lines
+
+    def _buf(self) -> "_Buffer":
+        """Return the line buffer of the current source."""
+        source = self.source
+        # the buffer is cached, for as long as the source string is unchanged
+        if self._buffer is None or self._buffer.source is not source:
+            self._buffer = _Buffer(source)
+        return self._buffer
 
     @property
     def source(self) -> str:
         if self._source is None:
-            with open(self.path, "r", encoding="utf-8") as f:
-                return f.read()
+            # re-read from disk, only if the file has been modified since the last read
+            mtime = os.stat(self.path).st_mtime_ns
+            if self._disk_source is None or mtime != self._disk_mtime:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._disk_source = f.read()
+                self._disk_mtime = mtime
+            return self._disk_source
         return self._source
 
     def get_assessment(self) -> SourceAssessResult:
@@ -369,6 +432,7 @@ class Document:
     def update_config(self, config: Config):
         self._config = config
         self._assessment = None
+        self._db_synced = False
 
     def apply_change(self, change: TextEdit):
         """Apply a change to the document."""
@@ -377,7 +441,7 @@ class Document:
 
         if not change_range:
             # The whole file has changed
-            self._source = text
+            self._update_source(text)
             return
 
         start_line = change_range["start"]["line"]
@@ -385,54 +449,86 @@ class Document:
         end_line = change_range["end"]["line"]
         end_col = change_range["end"]["character"]
 
+        buffer = self._buf()
+        source = buffer.source
+        offsets = buffer.offsets
+        num_lines = len(offsets) - 1
+
         # Check for an edit occuring at the very end of the file
-        if start_line == len(self.lines):
-            self._source = self.source + text
+        if start_line >= num_lines:
+            self._update_source(source + text)
             return
 
-        new = io.StringIO()
-
-        # Iterate over the existing document until we hit the edit range,
-        # at which point we write the new text, then loop until we hit
-        # the end of the range and continue writing.
-        for i, line in enumerate(self.lines):
-            if i < start_line:
-                new.write(line)
-                continue
-
-            if i > end_line:
-                new.write(line)
-                continue
-
-            if i == start_line:
-                new.write(line[:start_col])
-                new.write(text)
+        # Splice the new text in, between the start and end of the range,
+        # where columns past the end of a line are clamped to the end of that line
+        start_offset = min(offsets[start_line] + start_col, offsets[start_line + 1])
+        if end_line < num_lines:
+            end_offset = min(offsets[end_line] + end_col, offsets[end_line + 1])
+        else:
+            end_offset = offsets[-1]
+
+        new_source = source[:start_offset] + text + source[end_offset:]
+
+        if start_line == end_line:
+            # For the common case of typing within a line, where no line breaks
+            # are added or removed, only that line of the cached split is changed
+            lines = buffer.lines
+            line = lines[start_line]
+            line_offset = offsets[start_line]
+            new_line = (
+                line[: start_offset - line_offset]
+                + text
+                + line[end_offset - line_offset :]
+            )
+            previous_line = lines[start_line - 1] if start_line else ""
+            if _is_same_line(new_line, line, previous_line):
+                lines = lines.copy()
+                lines[start_line] = new_line
+                self._update_source(new_source)
+                self._buffer = _Buffer(new_source, lines)
+                return
 
-            if i == end_line:
-                new.write(line[end_col:])
+        self._update_source(new_source)
 
-        self._source = new.getvalue()
+    def _update_source(self, source: str):
+        self._source = source
         self._assessment = None
+        self._db_synced = False
 
     def get_line(self, position: Position) -> str:
         """Return the position's line."""
-        return self.lines[position["line"]]
+        return self._buf().line(position["line"])
 
     def get_line_before(self, position: Position) -> str:
         """Return the section of the position's line before the position."""
-        return self.lines[position["line"]][: position["character"]]
+        return self._buf().line(position["line"])[: position["character"]]
 
     def offset_at_position(self, position: Position):
         """Return the byte-offset pointed at by the given position."""
-        return position["character"] + len("".join(self.lines[: position["line"]]))
+        offsets = self._buf().offsets
+        return position["character"] + offsets[min(position["line"], len(offsets) - 1)]
 
     def word_at_position(self, position: Position, start_regex=None, end_regex=None):
         """Get the word under the cursor returning the start and end positions."""
-        if position["line"] >= len(self.lines):
+        lines = self._buf().lines
+        if position["line"] >= len(lines):
             return ""
 
-        line = self.lines[position["line"]]
+        line = lines[position["line"]]
         i = position["character"]
+
+        if start_regex is None and end_regex is None:
+            # strip the default word characters from either side of the position,
+            # which is done in C, rather than walking the characters in Python
+            start = line[:i]
+            # as for RE_START_WORD, a trailing line break is skipped
+            if start.endswith("\n"):
+                start = start[:-1]
+            end = line[i:]
+            word_start = start[len(start.rstrip(WORD_CHARS)) :]
+            word_end = end[: len(end) - len(end.lstrip(WORD_CHARS))]
+            return word_start + word_end
+
         # Split word in two
         start = line[:i]
         end = line[i:]
@@ -441,22 +537,110 @@ class Document:
         # These are guaranteed to match, even if they match the empty string
         start_regex = start_regex or RE_START_WORD
         end_regex = end_regex or RE_END_WORD
-        m_start = start_regex.findall(start)
-        m_end = end_regex.findall(end)
+        return start_regex.search(start).group(0) + end_regex.search(end).group(0)
 
-        return m_start[0] + m_end[-1]
 
+class _Buffer:
+    """A source string, with its (lazily computed) line split and line offsets.
 
-def match_uri_to_workspace(
-    uri: str, workspaces: Dict[str, Workspace], default: Workspace
-) -> Workspace:
-    """Find the workspace containing the URI."""
-    if uri is None:
-        return None
+    A new buffer is created for every new source string,
+    so that all ``Document`` methods share a single split of the source.
+    """
+
+    __slots__ = ("source", "_lines", "_offsets")
+
+    def __init__(self, source: str, lines: Optional[List[str]] = None):
+        self.source = source
+        self._lines = lines
+        self._offsets = None
+
+    @property
+    def lines(self) -> List[str]:
+        if self._lines is None:
+            self._lines = self.source.splitlines(True)
+        return self._lines
+
+    @property
+    def offsets(self) -> List[int]:
+        """Return the character offset at which each line starts.
+
+        The final item is the length of the source.
+        """
+        if self._offsets is None:
+            self._offsets = [0] + list(accumulate(map(len, self.lines)))
+        return self._offsets
+
+    def line(self, index: int) -> str:
+        return self.lines[index]
+
+
+def _is_same_line(new_line: str, old_line: str, previous_line: str) -> bool:
+    """Return whether replacing ``old_line`` with ``new_line``,
+    leaves the line boundaries of the document unchanged.
+    """
+    if new_line.splitlines(True) != [new_line]:
+        return False
+    new_content, old_content = new_line.splitlines()[0], old_line.splitlines()[0]
+    if new_line[len(new_content) :] != old_line[len(old_content) :]:
+        # the line break at the end of the line has changed
+        return False
+    # a "\r" at the end of the previous line, would combine with a leading "\n"
+    return not (new_line.startswith("\n") and previous_line.endswith("\r"))
+
+
+@lru_cache(maxsize=1024)
+def _get_path_parts(uri: str) -> Tuple[str, ...]:
+    # URIs always use forward slashes (on all platforms),
+    # so there is no need to go via the (slower) `pathlib.Path(uri).parts`
+    return tuple(part for part in uri.split("/") if part and part != ".")
+
+
+class WorkspaceTrie:
+    """A prefix tree of workspace paths, split by their parts.
+
+    This allows the workspace containing a URI to be found in O(path depth),
+    rather than comparing the URI against every workspace.
+    """
+
+    _LEAF = None  # the key under which a workspace URI is stored in a node
+
+    def __init__(self, workspace_uris: Iterable[str] = ()):
+        self._root = {}
+        for workspace_uri in workspace_uris:
+            self.add(workspace_uri)
+
+    def add(self, workspace_uri: str):
+        """Add a workspace URI to the tree."""
+        node = self._root
+        for part in _get_path_parts(workspace_uri):
+            node = node.setdefault(part, {})
+        node[self._LEAF] = workspace_uri
+
+    def match(self, uri: str) -> Optional[str]:
+        """Return the deepest workspace URI, which is a parent of the given URI."""
+        node, chosen_workspace = self._root, None
+        for part in _get_path_parts(uri):
+            node = node.get(part, None)
+            if node is None:
+                break
+            chosen_workspace = node.get(self._LEAF, chosen_workspace)
+        return chosen_workspace
+
+
+@lru_cache(maxsize=8)
+def _get_workspace_trie(workspace_uris: Tuple[str, ...]) -> WorkspaceTrie:
+    return WorkspaceTrie(workspace_uris)
+
+
+def _match_uri_parts(uri: str, workspace_uris: Tuple[str, ...]) -> Optional[str]:
+    """Return the workspace URI with the most path parts equal to those of the URI.
+
+    This is the fallback, for URIs that are outside every workspace.
+    """
     max_len, chosen_workspace = -1, None
-    path = pathlib.Path(uri).parts
-    for workspace in workspaces:
-        workspace_parts = pathlib.Path(workspace).parts
+    path = _get_path_parts(uri)
+    for workspace in workspace_uris:
+        workspace_parts = _get_path_parts(workspace)
         if len(workspace_parts) > len(path):
             continue
         match_len = 0
@@ -467,4 +651,29 @@ def match_uri_to_workspace(
             if match_len > max_len:
                 max_len = match_len
                 chosen_workspace = workspace
+    return chosen_workspace
+
+
+@lru_cache(maxsize=4096)
+def _match_uri_to_workspace_uri(
+    uri: str, workspace_uris: Tuple[str, ...]
+) -> Optional[str]:
+    chosen_workspace = _get_workspace_trie(workspace_uris).match(uri)
+    if chosen_workspace is None:
+        chosen_workspace = _match_uri_parts(uri, workspace_uris)
+    return chosen_workspace
+
+
+def match_uri_to_workspace(
+    uri: str, workspaces: Dict[str, Workspace], default: Workspace
+) -> Workspace:
+    """Find the workspace containing the URI.
+
+    This is the workspace with the longest path, that the URI's path starts with.
+    If no workspace contains the URI, it is the workspace with the most path parts
+    equal to those of the URI (compared position-wise), or else the default.
+    """
+    if uri is None:
+        return None
+    chosen_workspace = _match_uri_to_workspace_uri(uri, tuple(workspaces))
     return workspaces.get(chosen_workspace, default)
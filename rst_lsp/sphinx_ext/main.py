@@ -4,50 +4,124 @@ This modules contains `sphinx_env`,
 which is a context manager, that allows sphinx to be initialised,
 outside of the command-line.
 
+sphinx and docutils are only imported when first used,
+since importing them is relatively slow.
 """
+from concurrent.futures import (
+    as_completed,
+    Executor,
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from collections import deque
 from contextlib import contextmanager
+from functools import lru_cache
 import copy
-from io import StringIO
+from io import StringIO, TextIOBase
 from importlib import import_module
 import locale
+import multiprocessing
 import os
-import shutil
+import sys
 import tempfile
 import threading
-from typing import IO, List, Tuple
+from types import MappingProxyType
+from typing import (
+    IO,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    TYPE_CHECKING,
+)
 
 import attr
 
-from rst_lsp.docutils_ext import patch_globals as dpg  # noqa: F401
-from rst_lsp.sphinx_ext import patch_globals as spg  # noqa: F401
-
-from docutils.nodes import document
-from docutils.frontend import OptionParser
-from docutils.parsers.rst import Parser as RSTParser
-from docutils.utils import SystemMessage
-
-from sphinx import package_dir
-import sphinx.locale
-from sphinx.application import Sphinx
-from sphinx.util.console import nocolor, color_terminal, terminal_safe  # noqa
-from sphinx.util.docutils import docutils_namespace, patch_docutils
-from sphinx.util.docutils import sphinx_domains
-
-from rst_lsp.docutils_ext.block_lsp import RSTParserCustom
-from rst_lsp.docutils_ext.inliner_lsp import InlinerLSP
-from rst_lsp.docutils_ext.reporter import new_document
-from rst_lsp.docutils_ext.visitor_lsp import LSPTransform
 from rst_lsp.server.datatypes import DocumentSymbol
 
+if TYPE_CHECKING:
+    from docutils.frontend import Values  # noqa: F401
+    from docutils.nodes import document  # noqa: F401
+    from sphinx.application import Sphinx  # noqa: F401
 
-@attr.s
+
+@lru_cache(maxsize=1)
+def _patch_globals():
+    """Patch the docutils/sphinx globals, to be thread local (once only).
+
+    Note, the docutils globals are patched on import of ``rst_lsp.docutils_ext``,
+    before any of its modules are imported (and bind the globals).
+    """
+    from rst_lsp.docutils_ext import patch_globals as dpg  # noqa: F401
+    from rst_lsp.sphinx_ext import patch_globals as spg  # noqa: F401
+
+
+class BoundedStream(TextIOBase):
+    """A text stream, which only retains the last ``maxlines`` lines written to it.
+
+    This is used for streams that are written to throughout the server session.
+    """
+
+    def __init__(self, maxlines: int = 1000):
+        super().__init__()
+        self._lines = deque(maxlen=maxlines)
+        self._partial = ""
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        self._lines.extend(line + "\n" for line in lines)
+        return len(text)
+
+    def getvalue(self) -> str:
+        return "".join(self._lines) + self._partial
+
+
+@attr.s(slots=True, frozen=True)
 class SphinxAppEnv:
-    app: Sphinx = attr.ib()
+    app: "Sphinx" = attr.ib()
     roles: dict = attr.ib()
     directives: dict = attr.ib()
     additional_nodes: set = attr.ib()
     stream_status: IO = attr.ib()
     stream_error: IO = attr.ib()
+    # the default docutils settings, copied for each parse
+    default_settings: "Values" = attr.ib(default=None, repr=False)
+    # the full (read-only) namespace, see ``retrieve_namespace``
+    all_roles: Mapping = attr.ib(factory=dict, repr=False)
+    all_directives: Mapping = attr.ib(factory=dict, repr=False)
+
+
+_SCRATCH_DIR = None  # type: Optional[tempfile.TemporaryDirectory]
+_SCRATCH_LOCK = threading.Lock()
+_LOCALE_INITIALISED = False
+_LOCALE_LOCK = threading.Lock()
+
+
+def _get_scratch_dirs() -> Tuple[str, str]:
+    """Return a source and output directory, shared by all sphinx applications.
+
+    These are created once per process, and removed on exit.
+    """
+    global _SCRATCH_DIR
+    with _SCRATCH_LOCK:
+        if _SCRATCH_DIR is None:
+            _SCRATCH_DIR = tempfile.TemporaryDirectory()
+            for name in ("source", "out"):
+                os.mkdir(os.path.join(_SCRATCH_DIR.name, name))
+    return (
+        os.path.join(_SCRATCH_DIR.name, "source"),
+        os.path.join(_SCRATCH_DIR.name, "out"),
+    )
 
 
 def create_sphinx_app(
@@ -56,7 +130,7 @@ def create_sphinx_app(
     source_dir=None,
     output_dir=None,
     doctree_dir=None,
-) -> Tuple[Sphinx, dict, dict]:
+) -> SphinxAppEnv:
     """Yield a Sphinx Application, within a context.
 
     This context implements the standard sphinx patches to docutils,
@@ -70,11 +144,23 @@ def create_sphinx_app(
         dictionary containing parameters that will update those set from conf.py
 
     """
+    _patch_globals()
+    from docutils.frontend import OptionParser
+    from docutils.parsers.rst import Parser as RSTParser
+    from sphinx import package_dir
+    import sphinx.locale
+    from sphinx.application import Sphinx
+    from sphinx.util.docutils import docutils_namespace, patch_docutils
 
     # below is taken from sphinx.cmd.build.main
     # note: this may be removed in future
-    sphinx.locale.setlocale(locale.LC_ALL, "")
-    sphinx.locale.init_console(os.path.join(package_dir, "locale"), "sphinx")
+    # these set process-wide state, so only need to be run once
+    global _LOCALE_INITIALISED
+    with _LOCALE_LOCK:
+        if not _LOCALE_INITIALISED:
+            sphinx.locale.setlocale(locale.LC_ALL, "")
+            sphinx.locale.init_console(os.path.join(package_dir, "locale"), "sphinx")
+            _LOCALE_INITIALISED = True
 
     # below is adapted from sphinx.cmd.build.build_main
     confoverrides = confoverrides or {}
@@ -83,20 +169,16 @@ def create_sphinx_app(
 
     # these are not needed before build, but there existence is checked in ``Sphinx```
     # note source directory and output directory cannot be identical
-    _source_temp = _out_temp = None
-    if source_dir is None:
-        source_dir = _source_temp = tempfile.mkdtemp()
-    if output_dir is None and doctree_dir is None:
-        doctree_dir = output_dir = _out_temp = tempfile.mkdtemp()
-    elif doctree_dir is None:
-        doctree_dir = _out_temp = tempfile.mkdtemp()
-    elif output_dir is None:
-        output_dir = _out_temp = tempfile.mkdtemp()
+    if source_dir is None or output_dir is None or doctree_dir is None:
+        scratch_source, scratch_out = _get_scratch_dirs()
+        source_dir = source_dir or scratch_source
+        output_dir = output_dir or scratch_out
+        doctree_dir = doctree_dir or scratch_out
 
     app = None
     try:
-        log_stream_status = StringIO()
-        log_stream_warning = StringIO()
+        log_stream_status = BoundedStream()
+        log_stream_warning = BoundedStream()
         with patch_docutils(conf_dir), docutils_namespace():
             from docutils.parsers.rst.directives import _directives
             from docutils.parsers.rst.roles import _roles
@@ -115,21 +197,34 @@ def create_sphinx_app(
                 # args.freshenv, args.warningiserror,
                 # args.tags, args.verbosity, args.jobs, args.keep_going
             )
-            roles = copy.copy(_roles)
-            directives = copy.copy(_directives)
-            additional_nodes = copy.copy(additional_nodes)
+            # note, _roles and _directives are patched to be ``ThreadLocalDict``,
+            # for which ``copy.copy`` would share the underlying (thread local) data
+            roles = dict(_roles)
+            directives = dict(_directives)
+            additional_nodes = set(additional_nodes)
+            # computed within ``patch_docutils``, which sets the docutils config path
+            default_settings = OptionParser(
+                components=(RSTParser,)
+            ).get_default_values()
 
     except (Exception, KeyboardInterrupt) as exc:
         # handle_exception(app, args, exc, error)
         raise exc
-    finally:
-        if _source_temp:
-            shutil.rmtree(_source_temp, ignore_errors=True)
-        if _out_temp:
-            shutil.rmtree(_out_temp, ignore_errors=True)
 
-    return SphinxAppEnv(
-        app, roles, directives, additional_nodes, log_stream_status, log_stream_warning
+    app_env = SphinxAppEnv(
+        app,
+        roles,
+        directives,
+        additional_nodes,
+        log_stream_status,
+        log_stream_warning,
+        default_settings=default_settings,
+    )
+    all_roles, all_directives = _retrieve_namespace(app_env)
+    return attr.evolve(
+        app_env,
+        all_roles=MappingProxyType(all_roles),
+        all_directives=MappingProxyType(all_directives),
     )
 
 
@@ -143,30 +238,68 @@ def sphinx_env(app_env: SphinxAppEnv):
     - Patch docutils.languages.get_language(), to suppress reporter warnings
     - Temporarily sets `os.environ['DOCUTILSCONFIG']` to the sphinx confdir
     - Saves copies of roles._roles and directives._directives & resets them on exit
-    - Un-registers additional nodes (set via `register_node`) on exit
-      (by deleting `GenericNodeVisitor` visit/depart methods)
     - Patches roles.roles and directives.directives functions to also look in domains
+
+    Unlike sphinx's ``docutils_namespace``, the additional nodes are not
+    un-registered on exit (see ``_docutils_namespace``).
     """
-    with patch_docutils(app_env.app.confdir), docutils_namespace(), sphinx_domains(
+    _patch_globals()
+    from docutils.parsers.rst import directives, roles
+    from sphinx.util.docutils import patch_docutils
+    from sphinx.util.docutils import register_node, sphinx_domains
+
+    with patch_docutils(app_env.app.confdir), _docutils_namespace(), sphinx_domains(
         app_env.app.env
     ):
-        from docutils.parsers.rst import directives, roles
-        from sphinx.util.docutils import register_node
-
         if app_env.roles:
             roles._roles.update(app_env.roles)
         if app_env.directives:
             directives._directives.update(app_env.directives)
         for node in app_env.additional_nodes:
+            # this is only a look-up, if the node is already registered
             register_node(node)
-        # TODO how to make `unregister_node` thread safe
 
         yield
 
 
-def retrieve_namespace(app_env: SphinxAppEnv):
+@contextmanager
+def _docutils_namespace():
+    """Save the docutils roles/directives registries, and restore them on exit.
+
+    This is a variant of ``sphinx.util.docutils.docutils_namespace``,
+    which does not also un-register the additional nodes on exit.
+    Node registrations (``visit_``/``depart_`` methods on the thread local
+    node visitor classes) are instead kept for subsequent parses in the thread,
+    rather than deleting and re-adding them on every parse
+    (which also extended ``docutils.nodes.node_class_names`` every time).
+    Note, this means that the visitor classes of a thread accumulate the nodes
+    registered by every app_env parsed in that thread.
+    Since only the roles/directives determine which nodes are created,
+    the extra (unused) visitor methods do not change the parse output.
+
+    The registries are patched to be ``ThreadLocalDict`` (see ``_patch_globals``),
+    for which ``copy.copy`` would share the underlying (thread local) data,
+    so they are snapshot as plain dicts, and restored in-place.
+    """
+    from docutils.parsers.rst import directives, roles
+
+    saved_directives = dict(directives._directives)
+    saved_roles = dict(roles._roles)
+    try:
+        yield
+    finally:
+        directives._directives.clear()
+        directives._directives.update(saved_directives)
+        roles._roles.clear()
+        roles._roles.update(saved_roles)
+
+
+def retrieve_namespace(app_env: SphinxAppEnv) -> Tuple[Mapping, Mapping]:
     """Retrieve all available roles, directives and additional nodes.
 
+    The namespace only depends on the sphinx application,
+    so is computed once, by ``create_sphinx_app``, and stored as read-only mappings.
+
     Regarding the ``_roles`` and ``_directives`` mapping;
     sphinx presumably checks loads all roles/directives,
     when it loads its internal and conf specified extensions,
@@ -176,59 +309,134 @@ def retrieve_namespace(app_env: SphinxAppEnv):
     in docutils.parsers.rst.roles.role and
     similarly in docutils.parsers.rst.directives.directive
     """
+    return app_env.all_roles, app_env.all_directives
+
+
+def _retrieve_namespace(app_env: SphinxAppEnv) -> Tuple[dict, dict]:
     # TODO obtain the correct language mapping from docutils.languages.get_language
-    with threading.Lock():
-        with sphinx_env(app_env):
-            from docutils.parsers.rst.directives import _directives, _directive_registry
-            from docutils.parsers.rst.roles import _roles, _role_registry
-
-            all_roles = {}
-            all_directives = {}
-            all_roles.update(_role_registry)
-            all_roles.update(_roles)
-            all_directives.update(_directives)
-            for key, (modulename, classname) in _directive_registry.items():
-                if key not in all_directives:
-                    try:
-                        module = import_module(
-                            f"docutils.parsers.rst.directives.{modulename}"
-                        )
-                        all_directives[key] = getattr(module, classname)
-                    except (AttributeError, ModuleNotFoundError):
-                        pass
-            for domain_name in app_env.app.env.domains:
-                domain = app_env.app.env.get_domain(domain_name)
-                prefix = "" if domain.name == "std" else f"{domain.name}:"
-                # TODO 'default_domain' is also looked up by
-                # sphinx.util.docutils.sphinx_domains.lookup_domain_element
-                for role_name, role in domain.roles.items():
-                    all_roles[f"{prefix}{role_name}"] = role
-                for direct_name, direct in domain.directives.items():
-                    all_roles[f"{prefix}{direct_name}"] = direct
+    from docutils.parsers.rst import directives, roles
+
+    with sphinx_env(app_env):
+        # note, the ``_roles``/``_directives`` module attributes are re-bound
+        # by ``docutils_namespace``, so must be looked up within the context
+        all_roles = {}
+        all_directives = {}
+        all_roles.update(roles._role_registry)
+        all_roles.update(roles._roles)
+        all_directives.update(directives._directives)
+        module_prefix = "docutils.parsers.rst.directives."
+        for key, (modulename, classname) in directives._directive_registry.items():
+            if key not in all_directives:
+                try:
+                    module = _cached_import(module_prefix + modulename)
+                    all_directives[key] = getattr(module, classname)
+                except (AttributeError, ModuleNotFoundError):
+                    pass
+        for domain_name in app_env.app.env.domains:
+            domain = app_env.app.env.get_domain(domain_name)
+            prefix = "" if domain.name == "std" else f"{domain.name}:"
+            # TODO 'default_domain' is also looked up by
+            # sphinx.util.docutils.sphinx_domains.lookup_domain_element
+            for role_name, role in domain.roles.items():
+                all_roles[f"{prefix}{role_name}"] = role
+            for direct_name, direct in domain.directives.items():
+                all_roles[f"{prefix}{direct_name}"] = direct
     return all_roles, all_directives
 
 
-def find_all_files(srcdir: str, exclude_patterns: List[str], suffixes=(".rst",)):
-    """Adapted from ``sphinx.environment.BuildEnvironment.find_files``"""
+def _cached_import(module_name: str):
+    """Import a module, first checking if it is already loaded."""
+    module = sys.modules.get(module_name)
+    if module is None:
+        module = import_module(module_name)
+    return module
+
+
+def _scan_dir(
+    dirname: str, relative_root: str, excludes: List[Callable], suffixes: Tuple[str]
+) -> Tuple[List[str], List[Tuple[str, str, str]]]:
+    """List a directory, returning the relative paths of matching files,
+    and the absolute, relative and real paths of non-excluded sub-directories.
+    """
+    from sphinx.util.osutil import path_stabilize
+
+    files = []
+    dirs = []
+    try:
+        with os.scandir(dirname) as entries:
+            for entry in entries:
+                relative_path = path_stabilize(os.path.join(relative_root, entry.name))
+                if any(matcher(relative_path) for matcher in excludes):
+                    continue
+                # note, the entry type is cached from the directory listing
+                if entry.is_dir():
+                    dirs.append(
+                        (entry.path, relative_path, os.path.realpath(entry.path))
+                    )
+                elif entry.name.endswith(suffixes):
+                    files.append(relative_path)
+    except OSError:
+        pass
+    return files, dirs
+
+
+def _get_matching_files(
+    dirname: str, excludes: List[Callable], suffixes: Tuple[str]
+) -> List[str]:
+    """Return the relative paths of all files in a directory (and sub-directories),
+    which match the suffixes and are not excluded.
+
+    This is adapted from ``sphinx.util.get_matching_files``,
+    but directories are listed concurrently, in a thread pool,
+    since the time is mainly spent waiting on the file system.
+    Symbolic links are followed, but each (real) directory is only listed once,
+    which also guards against symbolic link loops.
+    The paths are returned sorted, since the listings complete in any order.
+    """
+    dirname = os.path.normpath(os.path.abspath(dirname))
+    filenames = []
+    visited = {os.path.realpath(dirname)}
+    with ThreadPoolExecutor() as executor:
+        pending = {executor.submit(_scan_dir, dirname, "", excludes, suffixes)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, dirs = future.result()
+                filenames.extend(files)
+                for path, relative, realpath in dirs:
+                    if realpath in visited:
+                        continue
+                    visited.add(realpath)
+                    pending.add(
+                        executor.submit(_scan_dir, path, relative, excludes, suffixes)
+                    )
+    return sorted(filenames)
+
+
+@lru_cache(maxsize=32)
+def _compile_excludes(exclude_patterns: Tuple[str]) -> List[Callable]:
+    """Compile the exclude patterns (plus the sphinx default excludes) to matchers."""
     from sphinx.project import EXCLUDE_PATHS
-    from sphinx.util import get_matching_files
     from sphinx.util.matching import compile_matchers
 
-    exclude_patterns.extend(EXCLUDE_PATHS)
-    excludes = compile_matchers(exclude_patterns)
+    return compile_matchers(list(exclude_patterns) + list(EXCLUDE_PATHS))
+
+
+def find_all_files(srcdir: str, exclude_patterns: List[str], suffixes=(".rst",)):
+    """Adapted from ``sphinx.environment.BuildEnvironment.find_files``"""
+    excludes = _compile_excludes(tuple(exclude_patterns))
+    suffixes = tuple(suffixes)
     docnames = set()
-    for filename in get_matching_files(srcdir, excludes):
-        if not any(filename.endswith(s) for s in suffixes):
-            continue
-        if os.access(os.path.join(srcdir, filename), os.R_OK):
-            filename = os.path.realpath(filename)
-            docnames.add(filename)
+    for filename in _get_matching_files(srcdir, excludes, suffixes):
+        path = os.path.join(srcdir, filename)
+        if os.access(path, os.R_OK):
+            docnames.add(os.path.realpath(path))
     return docnames
 
 
-@attr.s(kw_only=True)
+@attr.s(slots=True, frozen=True, kw_only=True)
 class SourceAssessResult:
-    doctree: document = attr.ib()
+    doctree: "document" = attr.ib()
     positions: List[dict] = attr.ib()
     references: List[dict] = attr.ib()
     pending_xrefs: List[dict] = attr.ib()
@@ -237,6 +445,9 @@ class SourceAssessResult:
     linting: List[dict] = attr.ib()
 
 
+_PARSERS = threading.local()
+
+
 def assess_source(
     content: str, app_env: SphinxAppEnv, doc_uri: str = "input.rst"
 ) -> SourceAssessResult:
@@ -254,11 +465,19 @@ def assess_source(
     SourceAssessResult
 
     """
+    from docutils.utils import DependencyList, SystemMessage
+
+    from rst_lsp.docutils_ext.block_lsp import RSTParserCustom
+    from rst_lsp.docutils_ext.inliner_lsp import InlinerLSP
+    from rst_lsp.docutils_ext.reporter import new_document
+    from rst_lsp.docutils_ext.visitor_lsp import LSPTransform
+
     with sphinx_env(app_env):
 
         # TODO look at sphinx.io.read_doc function, that is used for sphinx parsing
         # (see also sphinx.testing.restructuredtext.parse, for a basic implementation)
-        settings = OptionParser(components=(RSTParser,)).get_default_values()
+        settings = copy.copy(app_env.default_settings)
+        settings.record_dependencies = DependencyList()
         app_env.app.env.prepare_settings(doc_uri)
         settings.env = app_env.app.env
         doc_warning_stream = StringIO()
@@ -270,7 +489,11 @@ def assess_source(
 
         document, reporter = new_document(doc_uri, settings=settings)
 
-        parser = RSTParserCustom(inliner=InlinerLSP(doc_text=content))
+        # the parser and inliner are reused for each parse (in the same thread)
+        parser = getattr(_PARSERS, "parser", None)
+        if parser is None:
+            parser = _PARSERS.parser = RSTParserCustom(inliner=InlinerLSP(doc_text=""))
+        parser.inliner.set_content(content)
         try:
             parser.parse(content, document)
         except SystemMessage:
@@ -288,3 +511,84 @@ def assess_source(
         doc_symbols=transform.db_doc_symbols,
         linting=reporter.log_capture,
     )
+
+
+_WORKER_APP_ENV = None  # type: Optional[SphinxAppEnv]
+
+# below this number of files, they are assessed in-process,
+# since this is quicker than each worker process importing sphinx
+# and creating a sphinx application
+ASSESS_POOL_MIN_FILES = 8
+
+
+def _init_assess_worker(conf_dir: Optional[str]):
+    """Create the sphinx application for a worker process of ``assess_files``."""
+    global _WORKER_APP_ENV
+    _WORKER_APP_ENV = create_sphinx_app(conf_dir=conf_dir)
+
+
+def _assess_file(path: str, app_env: Optional[SphinxAppEnv] = None) -> dict:
+    # decode as for the open documents, so a file assesses the same, open or closed
+    with open(path, encoding="utf8") as handle:
+        source = handle.read()
+    result = assess_source(source, app_env or _WORKER_APP_ENV, doc_uri=path)
+    return {
+        "doc_symbols": result.doc_symbols,
+        "positions": result.positions,
+        "targets": result.targets,
+        "references": result.references,
+        "lints": result.linting,
+    }
+
+
+def create_assess_pool(
+    conf_dir: Optional[str] = None, max_workers=None
+) -> ProcessPoolExecutor:
+    """Create a pool of worker processes, for ``assess_files``.
+
+    Each worker creates its own sphinx application, from the ``conf_dir``,
+    so the pool should be kept for as long as this configuration is in use.
+    """
+    return ProcessPoolExecutor(
+        max_workers,
+        # fork is unsafe, since the language server process is multi-threaded
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_assess_worker,
+        initargs=(conf_dir,),
+    )
+
+
+def assess_files(
+    paths: Iterable[str],
+    app_env: SphinxAppEnv,
+    get_pool: Callable[[], Executor],
+    min_pool_files: int = ASSESS_POOL_MIN_FILES,
+) -> Iterator[Tuple[str, Future]]:
+    """Assess multiple files, in parallel if there are enough of them.
+
+    Fewer than ``min_pool_files`` files are assessed in-process (with ``app_env``),
+    otherwise they are submitted to the pool of worker processes
+    returned by ``get_pool`` (see ``create_assess_pool``).
+    Only the (picklable) data for the database is returned, not the doctree.
+
+    Yields
+    ------
+    Tuple[str, Future]
+        the path and completed future (of a dict of ``DocutilsCache.update_doc``
+        keyword arguments), in the order that the files finish being assessed
+
+    """
+    paths = list(paths)
+    if len(paths) < min_pool_files:
+        for path in paths:
+            future = Future()
+            try:
+                future.set_result(_assess_file(path, app_env))
+            except Exception as err:
+                future.set_exception(err)
+            yield path, future
+        return
+    executor = get_pool()
+    futures = {executor.submit(_assess_file, path): path for path in paths}
+    for future in as_completed(futures):
+        yield futures[future], future
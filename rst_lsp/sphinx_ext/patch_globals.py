@@ -12,4 +12,4 @@ from rst_lsp.thread_local import ThreadLocalSet
 from sphinx.util.docutils import additional_nodes
 
 
-additional_nodes = ThreadLocalSet(set(additional_nodes))
+additional_nodes = ThreadLocalSet(frozenset(additional_nodes))
@@ -1,5 +1,7 @@
 """Thread local variants of mutable types, for creating threadsafe globals."""
-from collections.abc import MutableMapping, MutableSet
+from collections.abc import MutableMapping, MutableSet, Set as AbstractSet
+from contextvars import ContextVar
+import functools
 import threading
 import types
 from typing import Optional
@@ -47,46 +49,45 @@ class ThreadLocalDict(MutableMapping):
 
 
 class ThreadLocalSet(MutableSet):
-    """A set that gets/sets separate data for each thread."""
+    """A set that gets/sets separate data for each thread (and asyncio task).
 
-    def __init__(self, initial: Optional[MutableSet] = None):
-        self._thread_local = threading.local()
-        if initial is not None:
-            if not isinstance(initial, MutableSet):
-                raise AssertionError("`initial` must be a mutable set")
-            self._thread_local.value = initial
+    The data is stored as an immutable ``frozenset`` in a ``ContextVar``,
+    which is replaced (copy-on-write) when the set is modified.
+    """
 
-    @property
-    def _set(self) -> MutableSet:
-        try:
-            value = self._thread_local.value
-        except AttributeError:
-            self._thread_local.value = value = set()
-        return value
+    def __init__(self, initial: Optional[AbstractSet] = None):
+        self._var = ContextVar(f"thread_local_set_{id(self)}", default=frozenset())
+        if initial is not None:
+            if not isinstance(initial, AbstractSet):
+                raise AssertionError("`initial` must be a set")
+            self._var.set(frozenset(initial))
 
     def _remove(self):
-        if hasattr(self._thread_local, "value"):
-            delattr(self._thread_local, "value")
+        self._var.set(frozenset())
 
     def __contains__(self, item):
-        return self._set.__contains__(item)
+        return item in self._var.get()
 
     def __iter__(self):
-        return self._set.__iter__()
+        return iter(self._var.get())
 
     def __len__(self):
-        return self._set.__len__()
+        return len(self._var.get())
 
     def add(self, item):
         """Add an element."""
-        return self._set.add(item)
+        value = self._var.get()
+        if item not in value:
+            self._var.set(value | {item})
 
     def discard(self, item):
         """Remove an element. Do not raise an exception if absent."""
-        return self._set.discard(item)
+        value = self._var.get()
+        if item in value:
+            self._var.set(value - {item})
 
     def __str__(self):
-        return self._set.__str__()
+        return set(self._var.get()).__str__()
 
 
 class ThreadLocalMeta(type):
@@ -94,29 +95,12 @@ class ThreadLocalMeta(type):
 
     def __new__(mcs, name, bases, attributes):
         attributes["_thread_local_attrs"] = threading.local()
-        new_class = super().__new__(mcs, name, bases, attributes)
-
-        def make_func(class_new_method):
-            """Create a __new__ function,
-            that will set the local thread attributes on the new instance.
-            """
-
-            def _new_inst_patch(cls, *args, **kwargs):
-                instance = class_new_method(cls)
-                for name, value in getattr(
-                    cls._thread_local_attrs, "value", {}
-                ).items():
-                    if callable(value):
-                        # bind functions as methods
-                        setattr(instance, name, types.MethodType(value, instance))
-                    else:
-                        setattr(instance, name, value)
-                return instance
-
-            return _new_inst_patch
-
-        new_class.__new__ = make_func(new_class.__new__)
-        return new_class
+        if "__getattr__" in attributes:
+            # keep the class's own ``__getattr__``, as a fallback
+            attributes["__getattr__"] = _wrap_getattr(attributes["__getattr__"])
+        else:
+            attributes["__getattr__"] = _get_thread_local_attr
+        return super().__new__(mcs, name, bases, attributes)
 
     def __getattr__(cls, name):
         """Called only for attributes that don't exist."""
@@ -127,8 +111,6 @@ class ThreadLocalMeta(type):
 
     def __setattr__(cls, name, value):
         """Called for all attributes."""
-        if name == "__new__" and getattr(value, "__name__", None) == "_new_inst_patch":
-            return super().__setattr__(name, value)
         if hasattr(cls, name) and name not in getattr(
             cls._thread_local_attrs, "value", {}
         ):
@@ -154,3 +136,35 @@ class ThreadLocalMeta(type):
                 f"is prohibited on type object '{cls}'"
             )
         cls._thread_local_attrs.value.pop(name)
+
+
+def _get_thread_local_attr(self, name):
+    """Look up a thread local attribute of the class, for an instance.
+
+    This is called only for attributes that don't exist on the instance,
+    so the (thread local) class attributes are bound lazily, when accessed,
+    rather than all being set on each new instance.
+    """
+    try:
+        value = type(self)._thread_local_attrs.value[name]
+    except (AttributeError, KeyError):
+        raise AttributeError(
+            f"'{type(self).__name__}' object has no attribute '{name}'"
+        )
+    if callable(value):
+        # bind functions as methods
+        return types.MethodType(value, self)
+    return value
+
+
+def _wrap_getattr(getattr_func):
+    """Wrap a class's own ``__getattr__``, to first look up thread local attributes."""
+
+    @functools.wraps(getattr_func)
+    def __getattr__(self, name):
+        try:
+            return _get_thread_local_attr(self, name)
+        except AttributeError:
+            return getattr_func(self, name)
+
+    return __getattr__
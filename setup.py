@@ -1,11 +1,20 @@
-from importlib import import_module
+import os
+import re
 
 from setuptools import setup, find_packages
 
 
+def get_version():
+    """Read the version from the package, without importing it."""
+    path = os.path.join(os.path.dirname(__file__), "rst_lsp", "__init__.py")
+    with open(path, encoding="utf8") as handle:
+        text = handle.read()
+    return re.search(r"^__version__\s*=\s*[\'\"]([^\'\"]+)", text, re.M).group(1)
+
+
 setup(
     name="rst-language-server",
-    version=import_module("rst_lsp").__version__,
+    version=get_version(),
     author="Chris Sewell",
     packages=find_packages(),
     install_requires=[
@@ -19,7 +28,12 @@ setup(
     extras_require={
         "jsonrpc": ["python-jsonrpc-server>0.3,<0.4", "pluggy>=0.13,<0.14"],
         "python_plugins": ["jedi>=0.15", "black>=19,<20"],
-        "testing": ["pytest>5,<6", "pytest-regressions", "sphinxcontrib-bibtex>=1.0.0"],
+        "testing": [
+            "pytest>5,<6",
+            "pytest-regressions",
+            "pytest-xdist>=1.30,<2",
+            "sphinxcontrib-bibtex>=1.0.0",
+        ],
         "code_style": ["black==19.3b0", "pre-commit==1.17.0", "flake8<3.8.0,>=3.7.0"],
     },
     entry_points={
@@ -1,43 +1,89 @@
+import functools
+import itertools
 import os
-from unittest import mock
+import pathlib
 import uuid
 
 import pytest
 
 
-PATH = os.path.realpath(os.path.join(os.path.dirname(__file__), "raw_files"))
-TEST_UUIDS = ["uuid_{}".format(i) for i in range(10000)]
+PATH = (pathlib.Path(__file__).parent / "raw_files").resolve()
 
 
 @pytest.fixture(scope="function", autouse=True)
-def mock_uuid():
+def mock_uuid(monkeypatch):
     # TODO uuids in tests increase by 1 if the test is called first??
-    with mock.patch.object(uuid, "uuid4", side_effect=TEST_UUIDS[:]):
-        yield
+    counter = itertools.count()
+    monkeypatch.setattr(uuid, "uuid4", lambda: "uuid_{}".format(next(counter)))
 
 
-@pytest.fixture(scope="function", autouse=True)
-def wipe_docutils():
-    # TODO should probably not need to do this.
-    # However, without this, tests/test_server/test_requests.py::test_completions fails,
-    # if called after docutils tests
+@pytest.fixture(scope="session", autouse=True)
+def docutils_snapshot():
+    """Snapshot the docutils role/directive registries, at the start of the session.
+
+    This is autouse, so that the snapshot is taken before any of the session scoped
+    sphinx applications are created (which register roles/directives).
+    """
+    from docutils.parsers.rst.directives import _directives
+    from docutils.parsers.rst.roles import _roles
+
+    return dict(_directives), dict(_roles)
+
+
+def _restore_docutils(snapshot):
     from docutils.parsers.rst.directives import _directives
     from docutils.parsers.rst.roles import _roles
 
+    directives, roles = snapshot
     _directives.clear()
+    _directives.update(directives)
     _roles.clear()
+    _roles.update(roles)
 
 
-@pytest.fixture()
+@pytest.fixture(scope="function", autouse=True)
+def wipe_docutils(docutils_snapshot):
+    # TODO should probably not need to do this.
+    # However, without this, tests/test_server/test_requests.py::test_completions fails,
+    # if called after docutils tests
+    _restore_docutils(docutils_snapshot)
+
+
+@pytest.fixture(scope="session")
+def sphinx_app_env():
+    """Return a default sphinx application, shared by all tests."""
+    from rst_lsp.sphinx_ext.main import create_sphinx_app
+
+    return create_sphinx_app()
+
+
+@pytest.fixture(scope="session")
+def sphinx_bibtex_app_env():
+    """Return a sphinx application, with the bibtex extension, shared by all tests."""
+    from rst_lsp.sphinx_ext.main import create_sphinx_app
+
+    return create_sphinx_app(confoverrides={"extensions": ["sphinxcontrib.bibtex"]})
+
+
+@pytest.fixture(scope="session")
+def sphinx_namespace(sphinx_app_env):
+    """Return the (roles, directives) of a default sphinx application."""
+    from rst_lsp.sphinx_ext.main import retrieve_namespace
+
+    return retrieve_namespace(sphinx_app_env)
+
+
+@pytest.fixture(scope="session")
 def get_test_file_path():
     def _get_test_file_path(name):
-        return os.path.join(PATH, name)
+        return str(PATH / name)
 
     return _get_test_file_path
 
 
-@pytest.fixture()
+@pytest.fixture(scope="session")
 def get_test_file_content(get_test_file_path):
+    @functools.lru_cache(maxsize=None)
     def _get_test_file_content(name):
         with open(get_test_file_path(name)) as handle:
             content = handle.read()
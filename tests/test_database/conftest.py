@@ -0,0 +1,17 @@
+import pytest
+
+from rst_lsp.database.main import DocutilsCache, OrmBase
+
+
+@pytest.fixture(scope="module")
+def shared_cache():
+    return DocutilsCache(":memory:", echo=False)
+
+
+@pytest.fixture()
+def cache(shared_cache):
+    """Return the module's database, emptied after each test."""
+    yield shared_cache
+    with shared_cache.context_session() as session:
+        for table in reversed(OrmBase.metadata.sorted_tables):
+            session.execute(table.delete())
@@ -1,18 +1,12 @@
 from datetime import datetime
 
-from rst_lsp.database.main import DocutilsCache
-from rst_lsp.sphinx_ext.main import create_sphinx_app, retrieve_namespace
 
-
-def test_init(tmp_path, data_regression):
-    cache = DocutilsCache(str(tmp_path), echo=False)
+def test_init(cache, data_regression):
     data_regression.check(cache.to_dict())
 
 
-def test_update_conf_file(tmp_path, data_regression):
-    cache = DocutilsCache(str(tmp_path), echo=False)
-    app_env = create_sphinx_app()
-    roles, directives = retrieve_namespace(app_env)
+def test_update_conf_file(cache, sphinx_namespace, data_regression):
+    roles, directives = sphinx_namespace
     cache.update_conf_file(
         "conf.py",
         mtime=datetime(2019, 12, 30, 0, 0, 0),
@@ -30,8 +24,7 @@ def test_update_conf_file(tmp_path, data_regression):
     )
 
 
-def test_update_doc(tmp_path, data_regression):
-    cache = DocutilsCache(str(tmp_path), echo=False)
+def test_update_doc(cache, data_regression):
     cache.update_doc(
         uri="test.rst",
         mtime=datetime(2019, 12, 30, 0, 0, 0),
@@ -88,8 +81,7 @@ def test_update_doc(tmp_path, data_regression):
     data_regression.check(cache.to_dict())
 
 
-def test_query_doc(tmp_path):
-    cache = DocutilsCache(str(tmp_path), echo=False)
+def test_query_doc(cache):
     cache.update_doc(
         uri="test.rst",
         mtime=datetime(2019, 12, 30, 0, 0, 0),
@@ -108,8 +100,7 @@ def test_query_doc(tmp_path):
     }
 
 
-def test_query_doc_load_lints(tmp_path):
-    cache = DocutilsCache(str(tmp_path), echo=False)
+def test_query_doc_load_lints(cache):
     lint = {
         "source": "docutils",
         "line": 20,
@@ -131,8 +122,7 @@ def test_query_doc_load_lints(tmp_path):
     assert doc.lints[0].column_dict(drop=("pk",)) == lint
 
 
-def test_query_doc_load_positions(tmp_path):
-    cache = DocutilsCache(str(tmp_path), echo=False)
+def test_query_doc_load_positions(cache):
     position = {
         "block": True,
         "endCharacter": 9,
@@ -162,8 +152,7 @@ def test_query_doc_load_positions(tmp_path):
     assert doc.positions[0].column_dict(drop=("pk",)) == position
 
 
-def test_query_at_position(tmp_path):
-    cache = DocutilsCache(str(tmp_path), echo=False)
+def test_query_at_position(cache):
     positions = [
         {
             "uuid": "uuid_1",
@@ -194,3 +183,22 @@ def test_query_at_position(tmp_path):
     assert cache.query_at_position(uri="test.rst", line=4, character=6) is None
     cache.query_at_position(uri="test.rst", line=0, character=6).uuid == "uuid_1"
     cache.query_at_position(uri="test.rst", line=2, character=6).uuid == "uuid_2"
+
+
+def test_update_docs(cache):
+    cache.update_docs(
+        [
+            dict(
+                uri=uri,
+                mtime=datetime(2019, 12, 30, 0, 0, 0),
+                positions=[],
+                references=[],
+                targets=[],
+                doc_symbols=[],
+                lints=[],
+            )
+            for uri in ("test1.rst", "test2.rst")
+        ]
+    )
+    assert cache.query_doc("test1.rst").uri == "test1.rst"
+    assert cache.query_doc("test2.rst").uri == "test2.rst"
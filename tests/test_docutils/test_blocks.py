@@ -1,3 +1,5 @@
+import copy
+from functools import lru_cache
 import os
 import sys
 
@@ -9,20 +11,33 @@ import yaml
 from rst_lsp.docutils_ext.inliner_base import Inliner
 from rst_lsp.docutils_ext.block_lsp import RSTParserCustom
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 
+
+@lru_cache(maxsize=None)
 def load_yaml(path):
-    with open(path) as fp:
-        data = yaml.safe_load(fp)
+    with open(path, "rb") as fp:
+        data = yaml.load(fp, Loader=SafeLoader)
+    for cases in data.values():
+        for case in cases:
+            case["source"] = "\n".join(case["in"])
     return data
 
 
+@lru_cache(maxsize=None)
+def get_default_settings(parser_class):
+    return frontend.OptionParser(components=(parser_class,)).get_default_values()
+
+
 def run_parser(case, parser_class, inliner=None):
-    source = "\n".join(case["in"])
+    source = case["source"]
     expected = "\n".join(case["out"])
 
     parser = parser_class(inliner=inliner)
-    option_parser = frontend.OptionParser(components=(parser_class,))
-    settings = option_parser.get_default_values()
+    settings = copy.copy(get_default_settings(parser_class))
     settings.report_level = 5
     settings.halt_level = 5
     # settings.debug = package_unittest.debug
@@ -1,3 +1,5 @@
+import copy
+from functools import lru_cache
 import os
 import sys
 
@@ -9,20 +11,31 @@ import yaml
 from rst_lsp.docutils_ext.inliner_base import Inliner
 from rst_lsp.docutils_ext.inliner_lsp import InlinerLSP
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 
+
+@lru_cache(maxsize=None)
 def load_yaml(path):
-    with open(path) as fp:
-        data = yaml.safe_load(fp)
+    with open(path, "rb") as fp:
+        data = yaml.load(fp, Loader=SafeLoader)
+    for cases in data.values():
+        for case in cases:
+            case["source"] = "\n".join(case["in"])
     return data
 
 
+_DEFAULT_SETTINGS = frontend.OptionParser(components=(rst.Parser,)).get_default_values()
+
+
 def run_parser(case, inliner=None):
-    source = "\n".join(case["in"])
+    source = case["source"]
     expected = "\n".join(case["out"])
 
     parser = rst.Parser(inliner=inliner)
-    option_parser = frontend.OptionParser(components=(rst.Parser,))
-    settings = option_parser.get_default_values()
+    settings = copy.copy(_DEFAULT_SETTINGS)
     settings.report_level = 5
     settings.halt_level = 5
     # settings.debug = package_unittest.debug
@@ -82,4 +95,4 @@ def test_interpreted(name, number, case):
     ],
 )
 def test_doc_position(name, number, case):
-    run_parser(case, inliner=InlinerLSP(doc_text="\n".join(case["in"])))
+    run_parser(case, inliner=InlinerLSP(doc_text=case["source"]))
@@ -1,18 +1,22 @@
-from textwrap import dedent
+import copy
 
-from docutils import frontend, utils
+from docutils import frontend, nodes, utils
 from docutils.parsers import rst
+import pytest
 
 from rst_lsp.docutils_ext.inliner_lsp import InlinerLSP
 from rst_lsp.docutils_ext.block_lsp import RSTParserCustom
-from rst_lsp.docutils_ext.visitor_lsp import VisitorRef2Target, LSPTransform
+from rst_lsp.docutils_ext.patch_globals import GenericNodeVisitorTLocal
+from rst_lsp.docutils_ext.visitor_lsp import VisitorLSP, VisitorRef2Target, LSPTransform
+
+
+_DEFAULT_SETTINGS = frontend.OptionParser(components=(rst.Parser,)).get_default_values()
 
 
 def run_parser(source, parser_class):
     inliner = InlinerLSP(doc_text=source)
     parser = parser_class(inliner=inliner)
-    option_parser = frontend.OptionParser(components=(rst.Parser,))
-    settings = option_parser.get_default_values()
+    settings = copy.copy(_DEFAULT_SETTINGS)
     settings.report_level = 5
     settings.halt_level = 5
     # settings.debug = package_unittest.debug
@@ -21,29 +25,37 @@ def run_parser(source, parser_class):
     return document
 
 
-def test_ref2target(file_regression):
-    source = dedent(
-        """\
-    .. _ref:
+def test_visitors_subclass_patched_globals():
+    """The globals are patched, before the visitor classes are created."""
+    assert nodes.GenericNodeVisitor is GenericNodeVisitorTLocal
+    assert issubclass(VisitorLSP, GenericNodeVisitorTLocal)
+    assert issubclass(VisitorRef2Target, GenericNodeVisitorTLocal)
 
-    .. __: anonymous
 
-    ref_ `ref`_ `phrase <ref_>`_ ref2_ anonymous__ unknown_
+REF2TARGET_SOURCE = """\
+.. _ref:
 
-    _`ref2`
+.. __: anonymous
 
-    |symbol| |unknown|
+ref_ `ref`_ `phrase <ref_>`_ ref2_ anonymous__ unknown_
 
-    [cite]_ [unknown]_
+_`ref2`
 
-    [1]_
+|symbol| |unknown|
 
-    .. |symbol| image:: symbol.png
-    .. [cite] This is a citation.
-    .. [1] This is a footnote.
+[cite]_ [unknown]_
 
-    """
-    )
+[1]_
+
+.. |symbol| image:: symbol.png
+.. [cite] This is a citation.
+.. [1] This is a footnote.
+
+"""
+
+
+def test_ref2target(file_regression):
+    source = REF2TARGET_SOURCE
     document = run_parser(source, parser_class=RSTParserCustom)
     visitor = VisitorRef2Target(document)
     document.walk(visitor)
@@ -52,113 +64,69 @@ def test_ref2target(file_regression):
     assert len(visitor.anonymous_refs) == 1
 
 
-def test_sections(data_regression):
-    source = dedent(
-        """\
-    title
-    =====
+LSP_TRANSFORM_SOURCES = {
+    "test_sections": """\
+title
+=====
 
-    :title:`a`
+:title:`a`
 
-    sub-title
-    ---------
+sub-title
+---------
 
-    :title:`b`
+:title:`b`
 
-    sub-title2
-    ----------
+sub-title2
+----------
 
-    :title:`c`
+:title:`c`
 
-    sub-sub-title
-    ~~~~~~~~~~~~~
+sub-sub-title
+~~~~~~~~~~~~~
 
-    :title:`d`
+:title:`d`
 
-    title2
-    ======
+title2
+======
 
-    :title:`e`
-    """
-    )
-    document = run_parser(source, parser_class=RSTParserCustom)
-    transform = LSPTransform(document)
-    transform.apply(source)
-    data_regression.check(
-        {
-            "db_positions": transform.db_positions,
-            "doc_symbols": transform.db_doc_symbols,
-            "db_references": transform.db_references,
-            "db_targets": transform.db_targets,
-        }
-    )
+:title:`e`
+""",
+    "test_target_refs": """\
+.. _target:
 
+[1]_ target_ |symbol| [cite]_
 
-def test_target_refs(data_regression):
-    source = dedent(
-        """\
-    .. _target:
+.. [1] This is a footnote.
+.. |symbol| image:: symbol.png
+.. [cite] This is a citation.
+""",
+    "test_directives": """\
+.. code:: python
 
-    [1]_ target_ |symbol| [cite]_
+   a=1
 
-    .. [1] This is a footnote.
-    .. |symbol| image:: symbol.png
-    .. [cite] This is a citation.
-    """
-    )
-    document = run_parser(source, parser_class=RSTParserCustom)
-    transform = LSPTransform(document)
-    transform.apply(source)
-    data_regression.check(
-        {
-            "db_positions": transform.db_positions,
-            "doc_symbols": transform.db_doc_symbols,
-            "db_references": transform.db_references,
-            "db_targets": transform.db_targets,
-        }
-    )
+.. image:: abc.png
+""",
+    "test_mixed1": """\
+.. _target:
 
+title
+-----
 
-def test_directives(data_regression):
-    source = dedent(
-        """\
-    .. code:: python
+.. note::
 
-       a=1
+   [1]_ target_ |symbol| [cite]_
 
-    .. image:: abc.png
-    """
-    )
-    document = run_parser(source, parser_class=RSTParserCustom)
-    transform = LSPTransform(document)
-    transform.apply(source)
-    data_regression.check(
-        {
-            "db_positions": transform.db_positions,
-            "doc_symbols": transform.db_doc_symbols,
-            "db_references": transform.db_references,
-            "db_targets": transform.db_targets,
-        }
-    )
+.. [1] This is a footnote.
+.. |symbol| image:: symbol.png
+.. [cite] This is a citation.
+""",
+}
 
 
-def test_mixed1(data_regression):
-    source = dedent(
-        """\
-    .. _target:
-
-    title
-    -----
-
-    .. note::
-
-       [1]_ target_ |symbol| [cite]_
-
-    .. [1] This is a footnote.
-    .. |symbol| image:: symbol.png
-    .. [cite] This is a citation.
-    """
-    )
+@pytest.mark.parametrize("name", list(LSP_TRANSFORM_SOURCES))
+def test_lsp_transform(name, data_regression):
+    source = LSP_TRANSFORM_SOURCES[name]
     document = run_parser(source, parser_class=RSTParserCustom)
     transform = LSPTransform(document)
     transform.apply(source)
@@ -168,5 +136,6 @@ def test_mixed1(data_regression):
             "doc_symbols": transform.db_doc_symbols,
             "db_references": transform.db_references,
             "db_targets": transform.db_targets,
-        }
+        },
+        basename=name,
     )
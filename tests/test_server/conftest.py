@@ -29,7 +29,11 @@ class ClientServer(object):
         # Server to client pipe
         scr, scw = os.pipe()
 
-        ParallelKind = multiprocessing.Process if os.name != "nt" else Thread
+        # a separate process is only needed to test the parent process checks
+        if check_parent_process and os.name != "nt":
+            ParallelKind = multiprocessing.Process
+        else:
+            ParallelKind = Thread
 
         self.process = ParallelKind(
             target=start_io_lang_server,
@@ -0,0 +1,21 @@
+import pytest
+
+from rst_lsp.server.plugins.python_blocks.utils import dedent_cell
+
+
+@pytest.mark.parametrize(
+    "lines,indent,expected",
+    [
+        (["   a = 1\n", "   b\n"], 3, "a = 1\nb"),
+        (["   a\n", "\n", "   b"], 3, "a\n\nb"),
+        # a short or empty last line must still produce a (final) line
+        (["   a\n", "   "], 3, "a\n"),
+        (["   a\n", ""], 3, "a\n"),
+        ([" b\n", "aa"], 3, "\n"),
+        # lone carriage returns are kept, as with per-line slicing
+        (["   a\r", "   b\r\n", "   c"], 3, "a\r\nb\r\nc"),
+        (["   a\r\n", " \r\n"], 3, "a\r\n"),
+    ],
+)
+def test_dedent_cell(lines, indent, expected):
+    assert dedent_cell(lines, indent) == expected
@@ -1,5 +1,3 @@
-from textwrap import dedent
-
 import pytest
 from pyls_jsonrpc.exceptions import JsonRpcMethodNotFound
 
@@ -46,48 +44,48 @@ def test_initialize(client_server, tmp_path, data_regression):
 # TODO how to test notifications, like publish diagnostics?
 
 
-def test_folding_provider(client_server, open_test_doc, data_regression):
-    content = dedent(
-        """\
-        title
-        -----
+FOLDING_SOURCE = """\
+title
+-----
 
-        abc
+abc
 
-        title2
-        ======
+title2
+======
 
-        def
-        """
-    )
-    doc = open_test_doc(client_server, content)
+def
+"""
+
+
+def test_folding_provider(client_server, open_test_doc, data_regression):
+    doc = open_test_doc(client_server, FOLDING_SOURCE)
     response3 = client_server._endpoint.request(
         "text_document/folding_range", {"textDocument": doc}
     ).result(timeout=CALL_TIMEOUT)
     data_regression.check(response3)
 
 
-def test_document_symbols(client_server, open_test_doc, data_regression):
-    content = dedent(
-        """\
-        title
-        -----
+SYMBOLS_SOURCE = """\
+title
+-----
 
-        |abc|
+|abc|
 
-        :ref`abc`
+:ref`abc`
 
-        title2
-        ======
+title2
+======
 
-        .. code:: python
+.. code:: python
 
-            print("hi")
+    print("hi")
 
-        def
-        """
-    )
-    doc = open_test_doc(client_server, content)
+def
+"""
+
+
+def test_document_symbols(client_server, open_test_doc, data_regression):
+    doc = open_test_doc(client_server, SYMBOLS_SOURCE)
     response3 = client_server._endpoint.request(
         "text_document/document_symbol", {"textDocument": doc}
     ).result(timeout=CALL_TIMEOUT)
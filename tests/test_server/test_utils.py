@@ -0,0 +1,71 @@
+import ntpath
+import os
+import types
+
+from rst_lsp.server import utils
+from rst_lsp.server.utils import find_parents
+
+
+def test_find_parents_nearest(tmp_path):
+    subdir = tmp_path / "a" / "b"
+    subdir.mkdir(parents=True)
+    (tmp_path / "conf.py").write_text("")
+    (tmp_path / "a" / "conf.py").write_text("")
+    path = str(subdir / "doc.rst")
+    assert find_parents(str(tmp_path), path, ["conf.py"]) == [
+        os.path.join(str(tmp_path / "a"), "conf.py")
+    ]
+
+
+def test_find_parents_order(tmp_path):
+    (tmp_path / "b.py").write_text("")
+    (tmp_path / "a.py").write_text("")
+    path = str(tmp_path / "doc.rst")
+    assert find_parents(str(tmp_path), path, ["b.py", "a.py", "c.py"]) == [
+        os.path.join(str(tmp_path), "b.py"),
+        os.path.join(str(tmp_path), "a.py"),
+    ]
+
+
+def test_find_parents_ignores_directories(tmp_path):
+    (tmp_path / "a" / "conf.py").mkdir(parents=True)
+    (tmp_path / "conf.py").write_text("")
+    path = str(tmp_path / "a" / "doc.rst")
+    assert find_parents(str(tmp_path), path, ["conf.py"]) == [
+        os.path.join(str(tmp_path), "conf.py")
+    ]
+
+
+def test_find_parents_stops_at_root(tmp_path):
+    (tmp_path / "conf.py").write_text("")
+    (tmp_path / "root" / "a").mkdir(parents=True)
+    path = str(tmp_path / "root" / "a" / "doc.rst")
+    assert find_parents(str(tmp_path / "root"), path, ["conf.py"]) == []
+
+
+def test_find_parents_missing_dir(tmp_path):
+    (tmp_path / "conf.py").write_text("")
+    path = str(tmp_path / "missing" / "doc.rst")
+    assert find_parents(str(tmp_path), path, ["conf.py"]) == [
+        os.path.join(str(tmp_path), "conf.py")
+    ]
+
+
+def test_find_parents_outside_root(tmp_path):
+    (tmp_path / "root").mkdir()
+    path = str(tmp_path / "doc.rst")
+    assert find_parents(str(tmp_path / "root"), path, ["conf.py"]) == []
+
+
+def test_find_parents_windows_case(monkeypatch):
+    """Windows paths compare case-insensitively, so the walk must still stop."""
+    scanned = []
+
+    def scandir(path):
+        scanned.append(path)
+        raise FileNotFoundError(path)
+
+    fake_os = types.SimpleNamespace(path=ntpath, scandir=scandir)
+    monkeypatch.setattr(utils, "os", fake_os)
+    assert find_parents("C:\\Proj", "c:\\proj\\docs\\doc.rst", ["conf.py"]) == []
+    assert scanned == ["c:\\proj\\docs", "c:\\proj"]
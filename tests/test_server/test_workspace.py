@@ -0,0 +1,163 @@
+import functools
+import multiprocessing
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from rst_lsp.server import uri_utils as uris
+from rst_lsp.server import workspace as workspace_module
+from rst_lsp.server.constants import MessageType
+from rst_lsp.server.workspace import _match_uri_to_workspace_uri, WorkspaceTrie
+from rst_lsp.server.workspace import Document, Workspace
+from rst_lsp.sphinx_ext.main import assess_files, assess_source, create_assess_pool
+
+# the uuids from the (spawned) worker processes are not mocked
+RE_UUID = re.compile(
+    r"uuid_\d+|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+)
+
+
+def _normalise_uuids(data) -> str:
+    """Return the repr of the data, with uuids replaced in order of appearance."""
+    mapping = {}
+    return RE_UUID.sub(
+        lambda match: mapping.setdefault(match.group(), f"uuid_{len(mapping)}"),
+        repr(data),
+    )
+
+
+def _change(start_line, start_col, end_line, end_col, text):
+    return {
+        "range": {
+            "start": {"line": start_line, "character": start_col},
+            "end": {"line": end_line, "character": end_col},
+        },
+        "text": text,
+    }
+
+
+@pytest.mark.parametrize(
+    "source,change,expected",
+    [
+        # typing within a line
+        ("abc\ndef\n", _change(0, 1, 0, 1, "X"), "aXbc\ndef\n"),
+        # an insert at the end of a line (before its line break)
+        ("abc\ndef\n", _change(0, 3, 0, 3, "X"), "abcX\ndef\n"),
+        # an insert past the end of a line, which is clamped to after its line break
+        ("abc\ndef\n", _change(0, 9, 0, 9, "X"), "abc\nXdef\n"),
+        # replacements spanning (part of) a "\r\n" line break
+        ("ab\r\ncd\r\n", _change(0, 1, 0, 4, "X"), "aXcd\r\n"),
+        ("ab\r\ncd\r\n", _change(0, 2, 0, 3, ""), "ab\ncd\r\n"),
+        ("ab\r\ncd\r\n", _change(0, 3, 0, 3, "X"), "ab\rX\ncd\r\n"),
+        ("ab\r\ncd\r\n", _change(1, 0, 1, 0, "\n"), "ab\r\n\ncd\r\n"),
+        ("ab\rcd\r\n", _change(1, 0, 1, 0, "\n"), "ab\r\ncd\r\n"),
+        # edits on the last line, with no trailing line break
+        ("abc\ndef", _change(1, 3, 1, 3, "X"), "abc\ndefX"),
+        ("abc\ndef", _change(1, 1, 1, 3, ""), "abc\nd"),
+        ("abc\ndef", _change(1, 0, 1, 3, ""), "abc\n"),
+        ("abc\ndef", _change(1, 3, 1, 3, "\n"), "abc\ndef\n"),
+        # an edit at the very end of the file
+        ("abc\n", _change(1, 0, 1, 0, "X"), "abc\nX"),
+    ],
+)
+def test_apply_change(source, change, expected):
+    doc = Document("file:///test.rst", source=source)
+    # compute the cached line split, before the change
+    assert doc.lines == source.splitlines(True)
+    doc.apply_change(change)
+    assert doc.source == expected
+    assert doc.lines == expected.splitlines(True)
+    assert doc._buf().offsets[-1] == len(expected)
+
+
+@pytest.mark.parametrize(
+    "uri,expected",
+    [
+        # nested folders match the deepest
+        ("file:///a/proj/doc.rst", "file:///a/proj"),
+        ("file:///a/proj/docs/doc.rst", "file:///a/proj/docs"),
+        ("file:///a/proj/docs/sub/doc.rst", "file:///a/proj/docs"),
+        # sibling folders, with a shared string prefix
+        ("file:///a/project/doc.rst", "file:///a/project"),
+        ("file:///a/projects/doc.rst", None),
+        # outside every folder
+        ("file:///b/proj/doc.rst", None),
+    ],
+)
+def test_workspace_trie(uri, expected):
+    trie = WorkspaceTrie(["file:///a/proj", "file:///a/proj/docs", "file:///a/project"])
+    assert trie.match(uri) == expected
+
+
+@pytest.mark.parametrize(
+    "uri,expected",
+    [
+        ("file:///a/proj/docs/doc.rst", "file:///a/proj/docs"),
+        ("file:///a/project/doc.rst", "file:///a/project"),
+        # outside every folder, falls back to the most equal path parts
+        ("file:///a/projects/doc.rst", "file:///a/proj"),
+        ("file:///b/proj/doc.rst", "file:///a/proj"),
+        ("file:///b/other/docs/doc.rst", "file:///a/proj/docs"),
+    ],
+)
+def test_match_uri_to_workspace_uri(uri, expected):
+    workspace_uris = ("file:///a/proj", "file:///a/proj/docs", "file:///a/project")
+    assert _match_uri_to_workspace_uri(uri, workspace_uris) == expected
+
+
+@pytest.mark.parametrize("min_pool_files", [0, 100], ids=["pool", "in_process"])
+def test_parse_closed_files(
+    sphinx_app_env, get_test_file_path, monkeypatch, min_pool_files
+):
+    paths = [
+        get_test_file_path("test_basic.rst"),
+        get_test_file_path("test_sections.rst"),
+        get_test_file_path("non_existent.rst"),
+    ]
+    updates = {}
+    messages = []
+
+    def update_doc(uri, **kwargs):
+        updates[uri] = kwargs
+
+    def log_message(message, msg_type=MessageType.Info):
+        messages.append((msg_type, message))
+
+    monkeypatch.setattr(
+        workspace_module,
+        "assess_files",
+        functools.partial(assess_files, min_pool_files=min_pool_files),
+    )
+    with create_assess_pool(max_workers=2) as pool:
+        workspace = SimpleNamespace(
+            app_env=sphinx_app_env,
+            _db=SimpleNamespace(update_doc=update_doc),
+            server=SimpleNamespace(log_message=log_message),
+            _get_assess_pool=lambda: pool,
+        )
+        assert Workspace.parse_closed_files(workspace, paths) == 2
+    # the worker processes exit, when the pool is shut down
+    assert multiprocessing.active_children() == []
+
+    # the results match those of assessing each file serially
+    assert set(updates) == {uris.from_fs_path(path) for path in paths[:2]}
+    for path in paths[:2]:
+        with open(path, encoding="utf8") as handle:
+            result = assess_source(handle.read(), sphinx_app_env, doc_uri=path)
+        kwargs = updates[uris.from_fs_path(path)]
+        kwargs.pop("mtime")
+        assert _normalise_uuids(kwargs) == _normalise_uuids(
+            {
+                "doc_symbols": result.doc_symbols,
+                "positions": result.positions,
+                "targets": result.targets,
+                "references": result.references,
+                "lints": result.linting,
+            }
+        )
+
+    # a failed file is reported, but does not stop the others being parsed
+    errors = [msg for msg_type, msg in messages if msg_type == MessageType.Error]
+    assert len(errors) == 1
+    assert errors[0].startswith(f"file parse failed: {paths[2]}: ")
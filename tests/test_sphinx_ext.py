@@ -1,10 +1,28 @@
-from rst_lsp.sphinx_ext.main import assess_source
-from rst_lsp.sphinx_ext.main import create_sphinx_app, retrieve_namespace
+import itertools
+from unittest import mock
+import uuid
 
+import pytest
 
-def test_retrieve_namespace(data_regression):
-    app_env = create_sphinx_app(confoverrides={"extensions": ["sphinxcontrib.bibtex"]})
-    roles, directives = retrieve_namespace(app_env)
+from rst_lsp.sphinx_ext.main import assess_source, BoundedStream
+from rst_lsp.sphinx_ext.main import _compile_excludes, _get_matching_files
+from rst_lsp.sphinx_ext.main import _docutils_namespace, retrieve_namespace
+from rst_lsp.sphinx_ext.main import sphinx_env
+from rst_lsp.thread_local import ThreadLocalDict
+
+
+@pytest.fixture(scope="module")
+def basic_results(sphinx_bibtex_app_env, get_test_file_content):
+    """Assess ``test_basic.rst`` once, for all tests that check its results."""
+    # the function scoped mock_uuid is not active for module fixtures
+    counter = itertools.count()
+    content = get_test_file_content("test_basic.rst")
+    with mock.patch.object(uuid, "uuid4", lambda: "uuid_{}".format(next(counter))):
+        return assess_source(content, sphinx_bibtex_app_env)
+
+
+def test_retrieve_namespace(sphinx_bibtex_app_env, data_regression):
+    roles, directives = retrieve_namespace(sphinx_bibtex_app_env)
     data_regression.check(
         {
             "roles": list(sorted(roles.keys())),
@@ -13,39 +31,25 @@ def test_retrieve_namespace(data_regression):
     )
 
 
-def test_basic_doctree(get_test_file_content, file_regression):
-    content = get_test_file_content("test_basic.rst")
-    app_env = create_sphinx_app(confoverrides={"extensions": ["sphinxcontrib.bibtex"]})
-    results = assess_source(content, app_env)
-    file_regression.check(results.doctree.pformat())
+def test_basic_doctree(basic_results, file_regression):
+    file_regression.check(basic_results.doctree.pformat())
 
 
-def test_basic_linting(get_test_file_content, data_regression):
-    content = get_test_file_content("test_basic.rst")
-    app_env = create_sphinx_app(confoverrides={"extensions": ["sphinxcontrib.bibtex"]})
-    results = assess_source(content, app_env)
+def test_basic_database(basic_results, data_regression):
     # TODO inline errors from docutils refers to wrong line, if after line break
-    data_regression.check(results.linting)
-
-
-def test_basic_database(get_test_file_content, data_regression):
-    content = get_test_file_content("test_basic.rst")
-    app_env = create_sphinx_app(confoverrides={"extensions": ["sphinxcontrib.bibtex"]})
-    results = assess_source(content, app_env)
     data_regression.check(
         {
-            "positions": results.positions,
-            "references": results.references,
-            "targets": results.targets,
-            "linting": results.linting,
+            "positions": basic_results.positions,
+            "references": basic_results.references,
+            "targets": basic_results.targets,
+            "linting": basic_results.linting,
         }
     )
 
 
-def test_lint_severe(get_test_file_content, data_regression):
+def test_lint_severe(sphinx_app_env, get_test_file_content, data_regression):
     content = get_test_file_content("test_lint_severe.rst")
-    app_env = create_sphinx_app()
-    results = assess_source(content, app_env)
+    results = assess_source(content, sphinx_app_env)
     data_regression.check(
         {
             "positions": results.positions,
@@ -56,10 +60,9 @@ def test_lint_severe(get_test_file_content, data_regression):
     )
 
 
-def test_section_levels(get_test_file_content, data_regression):
+def test_section_levels(sphinx_app_env, get_test_file_content, data_regression):
     content = get_test_file_content("test_sections.rst")
-    app_env = create_sphinx_app()
-    results = assess_source(content, app_env)
+    results = assess_source(content, sphinx_app_env)
     data_regression.check(
         {
             "positions": results.positions,
@@ -70,61 +73,58 @@ def test_section_levels(get_test_file_content, data_regression):
     )
 
 
-def test_sphinx_elements(file_regression, data_regression):
-    from textwrap import dedent
+SPHINX_ELEMENTS_SOURCE = """\
+.. _title:
 
-    source = dedent(
-        """\
-        .. _title:
+Title
+-----
 
-        Title
-        -----
+:ref:`title`
+:ref:`fig1`
+:ref:`tbl1`
+:eq:`eq1`
+:numref:`code1`
+:cite:`citation`
+:unknown:`abc`
 
-        :ref:`title`
-        :ref:`fig1`
-        :ref:`tbl1`
-        :eq:`eq1`
-        :numref:`code1`
-        :cite:`citation`
-        :unknown:`abc`
+.. versionadded:: 1.0
 
-        .. versionadded:: 1.0
+    A note about |RST|
 
-            A note about |RST|
+.. figure:: abc.png
+   :name: fig1
 
-        .. figure:: abc.png
-           :name: fig1
+.. table:: Truth table for "not"
+    :widths: auto
+    :name: tbl1
 
-        .. table:: Truth table for "not"
-            :widths: auto
-            :name: tbl1
+    =====  =====
+    A      not A
+    =====  =====
+    False  True
+    True   False
+    =====  =====
 
-            =====  =====
-            A      not A
-            =====  =====
-            False  True
-            True   False
-            =====  =====
+.. math::
+    :nowrap:
+    :label: eq1
 
-        .. math::
-            :nowrap:
-            :label: eq1
+    \\begin{eqnarray}
+        y    & = & ax^2 + bx + c \\\\
+        f(x) & = & x^2 + 2xy + y^2
+    \\end{eqnarray}
 
-            \\begin{eqnarray}
-                y    & = & ax^2 + bx + c \\\\
-                f(x) & = & x^2 + 2xy + y^2
-            \\end{eqnarray}
+.. code-block:: python::
+    :name: code1
 
-        .. code-block:: python::
-            :name: code1
+    pass
 
-            pass
+.. |RST| replace:: ReStructuredText
+"""
 
-        .. |RST| replace:: ReStructuredText
-        """
-    )
-    app_env = create_sphinx_app(confoverrides={"extensions": ["sphinxcontrib.bibtex"]})
-    results = assess_source(source, app_env)
+
+def test_sphinx_elements(sphinx_bibtex_app_env, file_regression, data_regression):
+    results = assess_source(SPHINX_ELEMENTS_SOURCE, sphinx_bibtex_app_env)
     file_regression.check(results.doctree.pformat())
     data_regression.check(
         {
@@ -135,3 +135,42 @@ def test_sphinx_elements(file_regression, data_regression):
             "targets": results.targets,
         }
     )
+
+
+def test_bounded_stream():
+    stream = BoundedStream(maxlines=2)
+    stream.write("a\nb")
+    stream.write("c\nd\ne")
+    assert stream.getvalue() == "bc\nd\ne"
+
+
+def test_docutils_namespace_restores(sphinx_app_env):
+    from docutils.parsers.rst import directives, roles
+
+    with sphinx_env(sphinx_app_env):
+        initial_roles = dict(roles._roles)
+        initial_directives = dict(directives._directives)
+        with _docutils_namespace():
+            roles._roles["dummy-role"] = object()
+            directives._directives["dummy-directive"] = object()
+            del roles._roles[next(iter(initial_roles))]
+        # the patched (thread local) registries are restored in-place
+        assert isinstance(roles._roles, ThreadLocalDict)
+        assert isinstance(directives._directives, ThreadLocalDict)
+        assert dict(roles._roles) == initial_roles
+        assert dict(directives._directives) == initial_directives
+
+
+def test_get_matching_files(tmp_path):
+    paths = ["b.rst", "a.rst", "c.txt", "sub/d.rst", "sub/excluded.rst", "ex/e.rst"]
+    for path in paths:
+        (tmp_path / path).parent.mkdir(exist_ok=True)
+        (tmp_path / path).write_text("")
+    # a symbolic link loop
+    (tmp_path / "sub" / "loop").symlink_to(tmp_path, target_is_directory=True)
+    excludes = _compile_excludes(("ex", "sub/excluded.rst"))
+    assert _get_matching_files(str(tmp_path), excludes, (".rst",)) == [
+        "a.rst",
+        "b.rst",
+        "sub/d.rst",
+    ]
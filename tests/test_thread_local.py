@@ -0,0 +1,37 @@
+import threading
+
+from rst_lsp.thread_local import ThreadLocalMeta
+
+
+def test_meta_thread_local_attrs():
+    class Visitor(metaclass=ThreadLocalMeta):
+        pass
+
+    Visitor.visit_node = lambda self: "visited"
+    assert Visitor().visit_node() == "visited"
+
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(hasattr(Visitor(), "visit_node"))
+    )
+    thread.start()
+    thread.join()
+    assert results == [False]
+
+
+def test_meta_own_getattr():
+    class Visitor(metaclass=ThreadLocalMeta):
+        def __getattr__(self, name):
+            return f"default_{name}"
+
+    Visitor.visit_node = lambda self: "visited"
+    visitor = Visitor()
+    # thread local attributes take precedence, then the class's own __getattr__
+    assert visitor.visit_node() == "visited"
+    assert visitor.depart_node == "default_depart_node"
+
+    results = []
+    thread = threading.Thread(target=lambda: results.append(Visitor().visit_node))
+    thread.start()
+    thread.join()
+    assert results == ["default_visit_node"]